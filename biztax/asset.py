@@ -1,7 +1,7 @@
 """
 Business-Taxation Asset class.
 """
-import copy
+import functools
 import numpy as np
 import pandas as pd
 from biztax.years import START_YEAR, END_YEAR, NUM_YEARS, HISTORY_START
@@ -13,18 +13,30 @@ class Asset():
     Constructor for the Asset class.
     This class includes several objects related to assets and depreciation:
         For internal class use:
-            investment_history:
+            asset_codes:
+                array of asset codes, asset type (95)
+            investment_arr:
                 array of investment amounts
-                asset type (95) x year investment made (68)
-            capital_history:
+                asset type (95) x year investment made (investment_years)
+            capital_arr:
                 array of asset amounts
-                asset type (95) x years in the budget window (NUM_YEARS)
+                asset type (95) x year (capital_years)
+            trueDep_arr:
+                array of true depreciation amounts
+                asset type (95) x year (trueDep_years)
+            investment_history, capital_history, trueDep:
+                DataFrame views of the arrays above, with a column for
+                each year, built on first use
             system_history:
                 array of depreciation systems (GDS or ADS)
                 asset type (95) x year investment made (68)
+            method_codes:
+                int8 array of depreciation method codes (positions in
+                METHODS), asset type (95) x year investment made (68)
             method_history:
-                array of depreciation methods (DB, Economics, etc.)
-                asset type (95) x year investment made (68)
+                list of arrays of depreciation methods (DB, Economics, etc.)
+                for each year investment made (68), a string view of
+                method_codes
             life_history:
                 array of tax lives (see LIVES list)
                 asset type (95) and year investment made (68) given system
@@ -34,6 +46,10 @@ class Asset():
             ccr_data:
                 DataFrame of asset amounts and economic depreciation rates
                 asset type (95), 2017 only
+            deduction_history:
+                array of tax depreciation and other CCR deductions
+                deduction type (2) x year investment made (68) x
+                years in the budget window (NUM_YEARS)
             capital_path:
                 DataFrame of asset information totals in the budget window
 
@@ -41,10 +57,25 @@ class Asset():
         corp: True for corporate, False for noncorporate
         btax_params: dict of business tax policy parameters
         response: DataFrame of investment responses
+        industry: industry code, or a list of industry codes (or 'all' for
+                  every industry in the data) to calculate together; the
+                  arrays then have a leading industry axis and capital_path
+                  has a row for each industry and year
+        baseline: Asset (after calc_all) whose deductions are reused for
+                  the vintages and years the policy does not change
     """
 
+    # Depreciation methods, coded by their position
+    METHODS = ['DB 200%', 'DB 150%', 'SL', 'Economic', 'Expensing', 'None']
+
+    # Exponential depreciation rates for declining balance and straight-line
+    DBSL_RATES = {'DB 200%': 2.0, 'DB 150%': 1.5, 'SL': 1.0}
+
+    # Tax lives of the asset classes with depreciation policy parameters
+    DEPR_CLASSES = [3, 5, 7, 10, 15, 20, 25, 27.5, 39]
+
     def __init__(self, btax_params, corp=True,
-                 data=None, response=None, industry='ALL'):
+                 data=None, response=None, industry='ALL', baseline=None):
         # Create an associated Data object
         if isinstance(data, Data):
             self.data = data
@@ -70,6 +101,29 @@ class Asset():
         else:
             raise ValueError('btax_params must be DataFrame')
         self.industry = industry
+        if isinstance(industry, str) and industry != 'all':
+            self.industries = None
+        elif industry == 'all':
+            if corp:
+                self.industries = list(pd.unique(
+                    self.data.investment_corp['industry']))
+            else:
+                self.industries = list(pd.unique(
+                    self.data.investment_noncorp['industry']))
+        elif (isinstance(industry, (list, tuple)) and len(industry) > 0
+              and all(isinstance(ind, str) for ind in industry)):
+            self.industries = list(industry)
+        else:
+            raise ValueError('industry must be a string or list of strings')
+        self._views = dict()
+        if baseline is None:
+            self.baseline = baseline
+        elif (isinstance(baseline, Asset) and baseline.corp == corp
+              and baseline.industry == industry):
+            self.baseline = baseline
+        else:
+            raise ValueError('baseline must be None or an Asset with the '
+                             'same corp and industry')
 
     def update_response(self, response):
         """
@@ -80,353 +134,561 @@ class Asset():
         assert isinstance(response, pd.DataFrame)
         self.response = response
 
+    def industry_array(self, dfg, columns):
+        """
+        Extracts the columns of the rows for the industry as an array,
+        asset type x column, with a leading industry axis when there is a
+        list of industries.
+        """
+        if self.industries is None:
+            return dfg.loc[dfg.industry == self.industry, columns].to_numpy()
+        return np.array([dfg.loc[dfg.industry == ind, columns].to_numpy()
+                         for ind in self.industries])
+
     def build_inv_matrix(self):
         """
         Builds investment array by asset type and by year made
         """
         # Get historical investment for 1960-2014
         if self.corp:
-            investment_dfg = copy.deepcopy(self.data.investment_corp)
+            investment_dfg = self.data.investment_corp
         else:
-            investment_dfg = copy.deepcopy(self.data.investment_noncorp)
-        investment_df = investment_dfg.loc[investment_dfg.industry == self.industry,:]
-        investment_df.drop(['industry'], axis=1, inplace=True)
-        investment_df.reset_index(drop=True, inplace=True)
+            investment_dfg = self.data.investment_noncorp
+        inv_hist = self.industry_array(
+            investment_dfg, [str(year) for year in range(HISTORY_START,
+                                                         START_YEAR + 1)])
+        nhist = START_YEAR - HISTORY_START + 1
+        inv = np.zeros(inv_hist.shape[:-1] + (END_YEAR - HISTORY_START + 1,))
+        inv[..., :nhist] = inv_hist
         # Extend investment using NGDP (growth factors from CBO forecast)
-        inv2014 = np.asarray(investment_df.loc[:, str(START_YEAR)])
-        for year in range(START_YEAR + 1, END_YEAR + 1):
-            gfact1 = (self.data.gfactors.loc[year-START_YEAR+1, 'fi_nonres']
-                      / self.data.gfactors.loc[1, 'fi_nonres'])
-            gfact2 = (self.data.gfactors.loc[year-START_YEAR+1, 'fi_res']
-                      / self.data.gfactors.loc[1, 'fi_res'])
-            investment_df.loc[:, str(year)] = inv2014 * gfact1
-            # Use residential investment gfactor for residential inv
-            investment_df.loc[91:, str(year)] = inv2014[91:] * gfact2
+        inv2014 = inv[..., nhist-1:nhist]
+        iyrs = range(2, NUM_YEARS + 1)
+        gfact1 = (np.asarray(self.data.gfactors.loc[iyrs, 'fi_nonres'])
+                  / self.data.gfactors.loc[1, 'fi_nonres'])
+        gfact2 = (np.asarray(self.data.gfactors.loc[iyrs, 'fi_res'])
+                  / self.data.gfactors.loc[1, 'fi_res'])
+        inv[..., nhist:] = inv2014 * gfact1
+        # Use residential investment gfactor for residential inv
+        inv[..., 91:, nhist:] = inv2014[..., 91:, :] * gfact2
         # Update investment matrix to include investment responses
         if self.response is not None:
             if self.corp:
                 deltaIkey = 'deltaIc'
             else:
                 deltaIkey = 'deltaInc'
-            for year in range(START_YEAR, END_YEAR + 1):
-                deltaI = np.asarray(self.response[deltaIkey + str(year)])
-                investment_df.loc[:,str(year)] = (investment_df.loc[:,str(year)]
-                                                  * (1. + deltaI))
-        self.investment_history = investment_df
+            deltaI = self.response[[deltaIkey + str(year) for year in
+                                    range(START_YEAR, END_YEAR + 1)]]
+            inv[..., nhist-1:] = inv[..., nhist-1:] * (1. + deltaI.to_numpy())
+        self.asset_codes = self.industry_array(investment_dfg, 'asset_code')
+        if self.industries is not None:
+            self.asset_codes = self.asset_codes[0]
+        self.investment_years = np.arange(HISTORY_START, END_YEAR + 1)
+        self.investment_arr = inv
+        self._views.pop('investment_history', None)
+
+    def insert_industries(self, df):
+        """
+        Inserts the industry column into a DataFrame view with rows for
+        each industry and asset type, when there is a list of industries.
+        """
+        if self.industries is not None:
+            df.insert(0, 'industry',
+                      np.repeat(self.industries,
+                                len(df) // len(self.industries)))
+
+    @property
+    def investment_history(self):
+        """
+        DataFrame view of investment_arr, with a column for each year
+        investment made and the asset codes.
+        """
+        if 'investment_history' not in self._views:
+            inv_df = pd.DataFrame(
+                self.investment_arr.reshape(-1, len(self.investment_years)),
+                columns=[str(year) for year in self.investment_years])
+            inv_df.insert(START_YEAR - HISTORY_START + 1, 'asset_code',
+                          np.resize(self.asset_codes, len(inv_df)))
+            self.insert_industries(inv_df)
+            self._views['investment_history'] = inv_df
+        return self._views['investment_history']
 
     def build_deprLaw_matrices(self):
         """
         Builds the arrays for tax depreciation laws
         """
-        def taxdep_final(depr_methods, depr_bonuses, depr_file):
-            """
-            Constructs the DataFrame of information for tax depreciation.
-            Only relevant for years beginning with START_YEAR.
-            Returns a DataFrame with:
-                depreciation method,
-                tax depreciation life,
-                true depreciation rate,
-                bonus depreciation rate.
-            """
-            taxdep = copy.deepcopy(self.data.taxdep_info_gross(depr_file))
-            system = np.asarray(taxdep['System'])
-            life = np.asarray(taxdep['L_gds'])
-            # Determine depreciation systems for each asset class (by GDS life)
-            for cl, method in depr_methods.items():
-                system[life == cl] = method
-            # Determine tax life
-            L_ads = np.asarray(taxdep['L_ads'])
-            Llist = np.asarray(taxdep['L_gds'])
-            Llist[system == 'ADS'] = L_ads[system == 'ADS']
-            Llist[system == 'None'] = 9e99
-            taxdep['L'] = Llist
-            # Determine depreciation method. Default is GDS method
-            method = np.asarray(taxdep['Method'])
-            for i in range(len(method)):
-                if system[i] == 'ADS':
-                    method[i] = np.asarray(taxdep['ADS method'])[i]
-                elif system[i] == 'Economic':
-                    method[i] = 'Economic'
-                elif system[i] == 'None':
-                    method[i] = 'None'
-                elif system[i] == 'Expensing':
-                    method[i] = 'Expensing'
-                elif system[i] != 'GDS':
-                    asset1 = np.asarray(taxdep['Asset'])[i]
-                    raise ValueError('Must specify depreciation system for '
-                                     + asset1 + '. Cannot use ' + str(system[i]))
-            taxdep['Method'] = method
-            # Detemine bonus depreciation rate
-            bonus = np.zeros(len(taxdep))
-            for cl, cl_bonus in depr_bonuses.items():
-                bonus[life == cl] = cl_bonus
-            taxdep['bonus'] = bonus
-            taxdep.drop(['L_gds', 'L_ads', 'Class life'],
-                        axis=1, inplace=True)
-            return taxdep
-
-        def taxdep_preset():
-            """
-            Constructs the DataFrame of information for tax depreciation.
-            Only relevant for years before START_YEAR.
-            Returns a DataFrame with:
-                depreciation method,
-                tax depreciation life,
-                true depreciation rate,
-                bonus depreciation rate.
-            """
-            taxdep = copy.deepcopy(self.data.taxdep_info_gross('pre2017'))
-            taxdep['L'] = taxdep['L_gds']
-            life = np.asarray(taxdep['L_gds'])
-            bonus = np.zeros(len(life))
-            for y in [3, 5, 7, 10, 15, 20, 25, 27.5, 39]:
-                s = "bonus{}".format(y if y != 27.5 else 27)
-                bonus[life == y] = self.data.bonus_data[s][year - HISTORY_START]
-            taxdep['bonus'] = bonus
-            taxdep.drop(['L_gds', 'L_ads', 'Class life'],
-                        axis=1, inplace=True)
-            return taxdep
-
-        def get_btax_params_oneyear(btax_params, year):
-            """
-            Extracts tax depreciation parameters and
-            calls the functions to build the tax depreciation
-            DataFrames.
-            """
-            if year >= START_YEAR:
-                year = min(year, END_YEAR)
-                iyr = year - START_YEAR
-                depr_methods = {}
-                depr_bonuses = {}
-                for y in [3, 5, 7, 10, 15, 20, 25, 27.5, 39]:
-                    s = "depr_{}yr_".format(y if y != 27.5 else 275)
-                    depr_methods[y] = btax_params[s + 'method'][iyr]
-                    depr_bonuses[y] = btax_params[s + 'bonus'][iyr]
-                depr_file = btax_params.loc[year-START_YEAR, 'depr_file']
-                taxdep = taxdep_final(depr_methods, depr_bonuses, depr_file)
-            else:
-                taxdep = taxdep_preset()
-            return taxdep
-        """
-        Create arrays and store depreciation rules in them
-        """
-        length1 = END_YEAR - HISTORY_START + 1
-        method_history = [[]] * length1
-        life_history = np.zeros((95, length1))
-        bonus_history = np.zeros((95, length1))
-        for year in range(HISTORY_START, END_YEAR + 1):
-            iyr = year - HISTORY_START
-            params_oneyear = get_btax_params_oneyear(self.btax_params, year)
-            method_history[iyr] = params_oneyear['Method']
-            life_history[:, iyr] = params_oneyear['L']
-            bonus_history[:, iyr] = params_oneyear['bonus']
-        self.method_history = method_history
-        self.life_history = life_history
-        self.bonus_history = bonus_history
+        iyrs = range(NUM_YEARS)
+        depr_files = tuple(self.btax_params.loc[iyrs, 'depr_file'])
+        depr_methods = list()
+        depr_bonuses = list()
+        for y in Asset.DEPR_CLASSES:
+            s = "depr_{}yr_".format(y if y != 27.5 else 275)
+            depr_methods.append(tuple(self.btax_params.loc[iyrs,
+                                                           s + 'method']))
+            depr_bonuses.append(tuple(self.btax_params.loc[iyrs,
+                                                           s + 'bonus']))
+        (method, life, bonus) = Asset.deprLaw_arrays(
+            depr_files, tuple(depr_methods), tuple(depr_bonuses))
+        self.method_codes = method
+        self.method_history = list(
+            np.asarray(Asset.METHODS, dtype=object)[method].T)
+        self.life_history = life
+        self.bonus_history = bonus
 
-    def calcDep_oneyear(self, year):
+    @staticmethod
+    @functools.lru_cache(maxsize=64)
+    def deprLaw_arrays(depr_files, depr_methods, depr_bonuses):
         """
-        Calculates total depreciation deductions taken in the year.
+        Builds the tax depreciation method, tax life and bonus rate arrays,
+        asset type (95) x year investment made, in one pass for each
+        distinct depr_file.
+        Parameters:
+            depr_files: tuple of depr_file for each year in the budget window
+            depr_methods: tuple (one for each class in DEPR_CLASSES) of
+                          depreciation systems for each year
+            depr_bonuses: tuple (one for each class in DEPR_CLASSES) of
+                          bonus depreciation rates for each year
+        Returns read-only arrays of method codes, lives and bonus rates.
+        Results are cached, so Assets with the same depreciation laws
+        share them.
+        """
+        data = Data()
+        nhist = START_YEAR - HISTORY_START
+        # Years before START_YEAR use the pre2017 rules and historical bonus
+        taxdep = data.taxdep_info_gross('pre2017')
+        method_pre = np.asarray(taxdep['Method'], dtype=object)
+        life_pre = np.asarray(taxdep['L_gds'], dtype=float)
+        bonus_pre = np.zeros((len(taxdep), nhist))
+        for y in Asset.DEPR_CLASSES:
+            s = "bonus{}".format(y if y != 27.5 else 27)
+            bonus_pre[life_pre == y, :] = (
+                np.asarray(data.bonus_data[s])[:nhist])
+        # Gather the tax depreciation information for each year
+        nyrs = len(depr_files)
+        system = np.empty((len(taxdep), nyrs), dtype=object)
+        method_gds = np.empty((len(taxdep), nyrs), dtype=object)
+        method_ads = np.empty((len(taxdep), nyrs), dtype=object)
+        life_gds = np.zeros((len(taxdep), nyrs))
+        life_ads = np.zeros((len(taxdep), nyrs))
+        assets = dict()
+        for depr_file in set(depr_files):
+            cols = np.array([depr_file == f for f in depr_files])
+            taxdep = data.taxdep_info_gross(depr_file)
+            life = np.asarray(taxdep['L_gds'], dtype=float)
+            system[:, cols] = np.asarray(taxdep['System'])[:, np.newaxis]
+            # Determine depreciation systems for each asset class
+            for cl, systems in zip(Asset.DEPR_CLASSES, depr_methods):
+                system[np.ix_(life == cl, cols)] = (
+                    np.asarray(systems, dtype=object)[cols])
+            method_gds[:, cols] = np.asarray(taxdep['Method'])[:, np.newaxis]
+            method_ads[:, cols] = (
+                np.asarray(taxdep['ADS method'])[:, np.newaxis])
+            life_gds[:, cols] = life[:, np.newaxis]
+            life_ads[:, cols] = np.asarray(taxdep['L_ads'])[:, np.newaxis]
+            assets[depr_file] = np.asarray(taxdep['Asset'])
+        # Check depreciation systems, reporting the first invalid one
+        valid = np.isin(system, ['GDS', 'ADS', 'Economic', 'None',
+                                 'Expensing'])
+        if not valid.all():
+            (iyr, i) = np.argwhere(~valid.T)[0]
+            raise ValueError('Must specify depreciation system for '
+                             + assets[depr_files[iyr]][i] + '. Cannot use '
+                             + str(system[i, iyr]))
+        # Determine tax life
+        life = np.where(system == 'ADS', life_ads, life_gds)
+        life[system == 'None'] = 9e99
+        # Determine depreciation method. Default is GDS method
+        method = np.where(system == 'ADS', method_ads, method_gds)
+        for name in ['Economic', 'None', 'Expensing']:
+            method[system == name] = name
+        # Determine bonus depreciation rate, by tax life in effect
+        bonus = np.zeros(life.shape)
+        for cl, cl_bonus in zip(Asset.DEPR_CLASSES, depr_bonuses):
+            bonus = np.where(life == cl, np.asarray(cl_bonus, dtype=float),
+                             bonus)
+        # Combine with the rules before START_YEAR
+        method = Asset.method_code(np.hstack(
+            [np.tile(method_pre[:, np.newaxis], (1, nhist)), method]))
+        life = np.hstack([np.tile(life_pre[:, np.newaxis], (1, nhist)), life])
+        bonus = np.hstack([bonus_pre, bonus])
+        for arr in (method, life, bonus):
+            arr.flags.writeable = False
+        return (method, life, bonus)
+
+    @staticmethod
+    def method_code(method):
+        """
+        Converts depreciation method names, or an array of them, to int8
+        method codes (positions in METHODS). Codes are returned unchanged.
+        """
+        method = np.asarray(method)
+        if method.dtype.kind in 'iu':
+            code = method.astype(np.int8)
+        else:
+            code = np.full(method.shape, -1, dtype=np.int8)
+            for i, name in enumerate(Asset.METHODS):
+                code[method == name] = i
+        assert ((code >= 0) & (code < len(Asset.METHODS))).all()
+        return code
+
+    @staticmethod
+    @functools.lru_cache(maxsize=1024)
+    def dbsl_schedule(method, life, bonus):
+        """
+        Computes the nominal depreciation deductions taken on a unit
+        investment using declining balance or straight-line depreciation,
+        half-year convention, for each number of years since the investment
+        was made (0 to END_YEAR - HISTORY_START).
+        These depend only on (method, life, bonus), so the schedules are
+        memoized in a least-recently-used cache shared by all Asset objects.
+        Parameters:
+            method: DB 200%, DB 150% or SL
+            life: tax life
+            bonus: effective bonus depreciation rate
+        Returns a read-only array.
+        """
+        N = Asset.DBSL_RATES[method]
+        L = float(life)
+        b = float(bonus)
+        s1 = np.arange(END_YEAR - HISTORY_START + 1)
+        s2 = s1 + 1
+        t0 = 0.5
+        t1 = t0 + L * (1 - 1 / N)
+        deduction = np.zeros(len(s1))
+        # Year investment made
+        c0 = (s1 == 0)
+        deduction[c0] = b + (1 - b) * (1 - np.exp(-N / L * 0.5))
+        # Entirely declining balance
+        c1 = ~c0 & (s1 <= L) & (s2 <= t1)
+        deduction[c1] = ((1 - b) * (np.exp(-N / L * (s1[c1] - t0))
+                                    - np.exp(-N / L * (s2[c1] - t0))))
+        # Straight-line, tax life ends during year
+        c2 = (~c0 & ~c1 & (s1 <= L) &
+              (s1 >= t1) & (s1 <= t0 + L) & (s2 > t0 + L))
+        deduction[c2] = ((1 - b) * (N / L * np.exp(1 - N)
+                                    * (s2[c2] - s1[c2]) * 0.5))
+        # Entirely straight-line
+        c3 = ~c0 & ~c1 & ~c2 & (s1 <= L) & (s1 >= t1) & (s2 <= t0 + L)
+        deduction[c3] = ((1 - b) * (N / L * np.exp(1 - N)
+                                    * (s2[c3] - s1[c3])))
+        # Switch from declining balance to straight-line during year
+        c4 = ~c0 & ~c1 & ~c2 & ~c3 & (s1 <= L) & (s1 < t1) & (s2 > t1)
+        deduction[c4] = ((1 - b) * (np.exp(-N / L * (s1[c4] - t0))
+                                    - np.exp(-N / L * (t1 - t0))
+                                    + N / L * np.exp(1 - N)
+                                    * (s2[c4] - t1)))
+        deduction.flags.writeable = False
+        return deduction
+
+    def calcUnitDep(self, years, first=0):
+        """
+        Calculates the nominal depreciation deduction taken on a unit
+        investment for every asset type, every year investment made (from
+        index first, counted from HISTORY_START) and every deduction year
+        in years, in a single vectorized pass.
+        Method codes are handled with separate masks:
+            DB 200%, DB 150% and SL: declining balance or straight-line,
+                                     half-year convention (dbsl_schedule)
+            Economic: economic depreciation
+            Expensing: full deduction in the year investment made
+            None: no deduction
+        Returns an array:
+            asset type (95) x year investment made x deduction year
         """
-        def depreciationDeduction(year_investment, year_deduction,
-                                  method, L, delta, bonus):
-            """
-            Computes the nominal depreciation deduction taken on any
-            unit investment in any year with any depreciation method and life.
-            Parameters:
-                year_investment: year the investment is made
-                year_deduction: year the CCR deduction is taken
-                method: method of CCR (DB 200%, DB 150%, SL, Expensing, None)
-                L: class life for DB or SL depreciation (MACRS)
-                delta: economic depreciation rate
-                bonus: bonus depreciation rate
-            """
-            assert method in ['DB 200%', 'DB 150%', 'SL',
-                              'Expensing', 'Economic', 'None']
-            # No depreciation
-            if method == 'None':
-                deduction = 0
-            # Expensing
-            elif method == 'Expensing':
-                if year_deduction == year_investment:
-                    deduction = 1.0
-                else:
-                    deduction = 0
-            # Economic depreciation
-            elif method == 'Economic':
-                yded = year_deduction
-                pi_temp = (
-                    self.data.investmentGfactors_data['pce'][yded + 1]
-                    / self.data.investmentGfactors_data['pce'][yded]
-                )
-                if pi_temp == np.exp(delta):
-                    annual_change = 1.0
-                else:
-                    if year_deduction == year_investment:
-                        annual_change = (
-                            ((pi_temp * np.exp(delta / 2)) ** 0.5 - 1)
-                            / (np.log(pi_temp - delta))
-                        )
-                    else:
-                        annual_change = (
-                            (pi_temp * np.exp(delta) - 1)
-                            / (np.log(pi_temp) - delta)
-                        )
-
-                if year_deduction < year_investment:
-                    sval = 0
-                    deduction = 0
-                elif year_deduction == year_investment:
-                    sval = 1.0
-                    deduction = (
-                        bonus + (1 - bonus) * delta * sval * annual_change
-                    )
-                else:
-                    sval = (np.exp(-delta * (year_deduction - year_investment)) *
-                            self.data.investmentGfactors_data['pce'][year_deduction] / 2.0 /
-                            (self.data.investmentGfactors_data['pce'][year_investment] +
-                             self.data.investmentGfactors_data['pce'][year_investment + 1]))
-                    deduction = (1 - bonus) * delta * sval * annual_change
+        years = np.asarray(years).reshape(-1)
+        nvint = END_YEAR - HISTORY_START + 1
+        # Depreciation rules by asset type and year investment made
+        method = self.method_codes[:, first:]
+        life = self.life_history[:, first:]
+        bonus = np.minimum(self.bonus_history[:, first:]
+                           * self.adjustments['bonus']
+                           + self.adjustments['sec179'], 1.0)
+        # Unit deduction schedules for DB and SL methods
+        dbsl = np.isin(method, Asset.method_code(list(Asset.DBSL_RATES)))
+        sched_index = np.full(method.shape, -1)
+        sched_table = np.zeros((1, nvint))
+        if dbsl.any():
+            keys, key_index = np.unique(
+                np.column_stack([method[dbsl], life[dbsl], bonus[dbsl]]),
+                axis=0, return_inverse=True)
+            sched_table = np.array([
+                Asset.dbsl_schedule(Asset.METHODS[int(key[0])],
+                                    key[1], key[2])
+                for key in keys])
+            sched_index[dbsl] = key_index.reshape(-1)
+        # Economic depreciation rates by asset type and deduction year
+        delta_by_file = {}
+        delta = np.zeros((95, len(years)))
+        for k, year in enumerate(years):
+            if year < START_YEAR:
+                # Use the same rules as taxdep_preset before calculator
+                depr_file = 'pre2017'
             else:
-                if method == 'DB 200%':
-                    N = 2
-                elif method == 'DB 150%':
-                    N = 1.5
-                elif method == 'SL':
-                    N = 1
-
-            # DB or SL depreciation, half-year convention
-                t0 = year_investment + 0.5
-                t1 = t0 + L * (1 - 1 / N)
-                s1 = year_deduction
-                s2 = s1 + 1
-                if year_deduction < year_investment:
-                    deduction = 0
-                elif year_deduction > year_investment + L:
-                    deduction = 0
-                elif year_deduction == year_investment:
-                    deduction = (
-                        bonus + (1 - bonus) * (1 - np.exp(-N / L * 0.5))
-                    )
-                elif s2 <= t1:
-                    deduction = ((1 - bonus) * (np.exp(-N / L * (s1 - t0)) -
-                                                np.exp(-N / L * (s2 - t0))))
-                elif s1 >= t1 and s1 <= t0 + L and s2 > t0 + L:
-                    deduction = (
-                        (1 - bonus) * (N / L * np.exp(1 - N)
-                                       * (s2 - s1) * 0.5)
-                    )
-                elif s1 >= t1 and s2 <= t0 + L:
-                    deduction = (
-                        (1 - bonus) * (N / L * np.exp(1 - N) * (s2 - s1))
-                    )
-                elif s1 < t1 and s2 > t1:
-                    deduction = (
-                        (1 - bonus) * (np.exp(-N / L * (s1 - t0)) -
-                                       np.exp(-N / L * (t1 - t0)) +
-                                       N / L * np.exp(1 - N) * (s2 - t1))
-                    )
-            return deduction
-
-        """
-        Calculate depreciation deductions for each year
-        """
-        unitDep_arr = np.zeros((95, END_YEAR - HISTORY_START + 1))
-        depr_file = self.btax_params.loc[year-START_YEAR, 'depr_file']
-        delta = np.asarray(self.data.taxdep_info_gross(depr_file)['delta'])
-        for i in range(95):
-            # Iterate over asset types
-            for j in range(END_YEAR - HISTORY_START + 1):
-                # Iterate over investment years
-                bonus1 = min((self.bonus_history[i, j]
-                              * self.adjustments['bonus']
-                              + self.adjustments['sec179']), 1.0)
-                unitDep_arr[i, j] = depreciationDeduction(
-                    j, year - HISTORY_START, self.method_history[j][i],
-                    self.life_history[i, j], delta[i], bonus1
-                )
-        inv_hist = copy.deepcopy(self.investment_history)
-        inv_hist.drop(['asset_code'], axis=1, inplace=True)
-        inv_hist2 = inv_hist.to_numpy()
-        Dep_arr = inv_hist2 * unitDep_arr
+                depr_file = self.btax_params.loc[year-START_YEAR,
+                                                 'depr_file']
+            if depr_file not in delta_by_file:
+                delta_by_file[depr_file] = np.asarray(
+                    self.data.taxdep_info_gross(depr_file)['delta'])
+            delta[:, k] = delta_by_file[depr_file]
+        # Broadcast to asset type x year investment made x deduction year
+        (method, sched_index, bonus, delta,
+         yinv, yded) = np.broadcast_arrays(
+            method[:, :, np.newaxis], sched_index[:, :, np.newaxis],
+            bonus[:, :, np.newaxis], delta[:, np.newaxis, :],
+            np.arange(first, nvint).reshape(1, nvint - first, 1),
+            (years - HISTORY_START).reshape(1, 1, len(years)))
+        unitdep = np.zeros(method.shape)
+        # Expensing
+        unitdep[(method == Asset.METHODS.index('Expensing'))
+                & (yded == yinv)] = 1.0
+        # Economic depreciation
+        mask = (method == Asset.METHODS.index('Economic')) & (yded >= yinv)
+        d = delta[mask]
+        b = bonus[mask]
+        i = yinv[mask]
+        s = yded[mask]
+        pce = np.asarray(self.data.investmentGfactors_data['pce'])
+        pi_temp = pce[s + 1] / pce[s]
+        first_year = (s == i)
+        annual_change = np.ones(len(d))
+        chg = (pi_temp != np.exp(d)) & first_year
+        annual_change[chg] = (((pi_temp[chg] * np.exp(d[chg] / 2)) ** 0.5 - 1)
+                              / (np.log(pi_temp[chg] - d[chg])))
+        chg = (pi_temp != np.exp(d)) & ~first_year
+        annual_change[chg] = ((pi_temp[chg] * np.exp(d[chg]) - 1)
+                              / (np.log(pi_temp[chg]) - d[chg]))
+        sval = np.ones(len(d))
+        later = ~first_year
+        sval[later] = (np.exp(-d[later] * (s[later] - i[later])) *
+                       pce[s[later]] / 2.0 /
+                       (pce[i[later]] + pce[i[later] + 1]))
+        unitdep[mask] = (np.where(first_year, b, 0.)
+                         + (1 - b) * d * sval * annual_change)
+        # DB or SL depreciation, from the schedules by years since investment
+        gap = yded - yinv
+        mask = (sched_index >= 0) & (gap >= 0)
+        unitdep[mask] = sched_table[sched_index[mask], gap[mask]]
+        return unitdep
+
+    def calcDep_vintages(self, years, first=0):
+        """
+        Calculates the tax depreciation and other CCR deductions taken in
+        each year in years on the investment made in each year (from index
+        first, counted from HISTORY_START), from a single investment matrix
+        and a single unit deduction array.
+        Returns an array:
+            deduction type (depreciation, other CCR) x year investment made
+            x deduction year
+        """
+        years = np.asarray(years).reshape(-1)
+        nvint = END_YEAR - HISTORY_START + 1
+        Dep_arr = (self.investment_arr[..., first:, np.newaxis]
+                   * self.calcUnitDep(years, first))
         # Apply the haircut on undepreciated basis
-        iyr = year - START_YEAR
-        if year < START_YEAR:
-            # Use no haircut for years before calculator
-            hc_undep_year = 0
-            hc_undep = 0.
+        # Use no haircut for years before calculator
+        hc_undep_year = np.zeros(len(years))
+        hc_undep = np.zeros(len(years))
+        window = (years >= START_YEAR)
+        iyrs = years[window] - START_YEAR
+        if self.corp:
+            hc_undep_year[window] = np.asarray(
+                self.btax_params['undepBasis_corp_hcyear'])[iyrs]
+            hc_undep[window] = np.asarray(
+                self.btax_params['undepBasis_corp_hc'])[iyrs]
         else:
-            if self.corp:
-                hc_undep_year = np.array(self.btax_params['undepBasis_corp_hcyear'])[iyr]
-                hc_undep = np.array(self.btax_params['undepBasis_corp_hc'])[iyr]
-            else:
-                hc_undep_year = np.array(self.btax_params['undepBasis_noncorp_hcyear'])[iyr]
-                hc_undep = np.array(self.btax_params['undepBasis_noncorp_hc'])[iyr]
-        if year >= hc_undep_year:
-            for j in range(END_YEAR - HISTORY_START + 1):
-                if j < hc_undep_year:
-                    Dep_arr[:, j] = Dep_arr[:, j] * (1 - hc_undep)
+            hc_undep_year[window] = np.asarray(
+                self.btax_params['undepBasis_noncorp_hcyear'])[iyrs]
+            hc_undep[window] = np.asarray(
+                self.btax_params['undepBasis_noncorp_hc'])[iyrs]
+        # Mask of year investment made (index j) x deduction year
+        j = np.arange(first, nvint).reshape(nvint - first, 1)
+        haircut = (years >= hc_undep_year) & (j < hc_undep_year)
+        Dep_arr = Dep_arr * np.where(haircut, 1 - hc_undep, 1.0)
         # Asset types included in tax depreciation or not
         other_assets = [68, 69, 70] # Software
         other_assets.extend(range(71, 86)) # Add R&D categories
         depr_assets = list(range(0, 68)) # Tangible assets
         depr_assets.extend(range(86, 95)) # Add artistic originals
         depr_assets.append(93) # Add residential
-        # Tax depreciation deduction
-        depded = Dep_arr[depr_assets,:].sum().sum()
-        # Other CCR deduction
-        otherded = Dep_arr[other_assets,:].sum().sum()
-        return [depded, otherded]
+        # Tax depreciation and other CCR deductions
+        return np.array([Dep_arr[..., depr_assets, :, :].sum(axis=-3),
+                         Dep_arr[..., other_assets, :, :].sum(axis=-3)])
+
+    def calcDep_years(self, years):
+        """
+        Calculates total depreciation deductions and other CCR deductions
+        taken in each year in years.
+        Returns a list of two arrays by year: [depded, otherded]
+        """
+        return list(self.calcDep_vintages(years).sum(axis=-2))
+
+    def calcDep_oneyear(self, year):
+        """
+        Calculates total depreciation deductions taken in the year.
+        """
+        [depded, otherded] = self.calcDep_years([year])
+        return [depded[0], otherded[0]]
 
     def calcDep_allyears(self):
         """
         Calculates total depreciation deductions taken for all years
         1960-2035.
         """
-        dep_deductions = np.zeros(END_YEAR + 1 - HISTORY_START)
-        for year in range(HISTORY_START, END_YEAR + 1):
-            dep_deductions[year - HISTORY_START] = self.calcDep_oneyear(year)[0]
-        return dep_deductions
+        return self.calcDep_years(range(HISTORY_START, END_YEAR + 1))[0]
 
     def calcDep_budget(self):
         """
         Calculates total depreciation deductions taken for START_ to END_YEAR.
         """
-        dep_deductions = np.zeros(NUM_YEARS)
-        other_deductions = np.zeros(NUM_YEARS)
-        for iyr in range(0, NUM_YEARS):
-            year = iyr + START_YEAR
-            [depded, otherded] = self.calcDep_oneyear(year)
-            dep_deductions[iyr] = depded
-            other_deductions[iyr] = otherded
-        return dep_deductions
+        return self.calcDep_years(range(START_YEAR, END_YEAR + 1))[0]
+
+    def build_deduction_history(self):
+        """
+        Builds the array of tax depreciation and other CCR deductions by
+        year investment made and year in the budget window.
+        With a baseline Asset, its deductions are reused, and only the
+        vintages with different investment or depreciation laws, and the
+        deduction years with a different depr_file or haircut, are
+        recomputed.
+        """
+        years = np.arange(START_YEAR, END_YEAR + 1)
+        base = self.baseline
+        if base is None or not hasattr(base, 'deduction_history'):
+            self.deduction_history = self.calcDep_vintages(years)
+            return
+        # First year investment made with different investment or rules
+        changed = ((self.investment_arr != base.investment_arr)
+                   | (self.method_codes != base.method_codes)
+                   | (self.life_history != base.life_history)
+                   | (self.bonus_history != base.bonus_history))
+        changed = changed.reshape(-1, changed.shape[-1]).any(axis=0)
+        first = np.argmax(changed) if changed.any() else len(changed)
+        # Deduction years with different rules for every vintage
+        if self.corp:
+            cols = ['depr_file', 'undepBasis_corp_hcyear',
+                    'undepBasis_corp_hc']
+        else:
+            cols = ['depr_file', 'undepBasis_noncorp_hcyear',
+                    'undepBasis_noncorp_hc']
+        redo = np.zeros(NUM_YEARS, dtype=bool)
+        for col in cols:
+            redo |= (np.asarray(self.btax_params[col])[:NUM_YEARS]
+                     != np.asarray(base.btax_params[col])[:NUM_YEARS])
+        deductions = base.deduction_history.copy()
+        if first < len(changed):
+            deductions[..., first:, :] = self.calcDep_vintages(years, first)
+        if redo.any():
+            deductions[..., redo] = self.calcDep_vintages(years[redo])
+        self.deduction_history = deductions
+
+    @staticmethod
+    def accumulate_capital(capital0, investment, delta, pce):
+        """
+        Accumulates capital stocks from the recursion
+            K[t+1] = (K[t] - delta * K[t] + I[t]) * pce[t+1] / pce[t]
+        in closed form, as a discounted cumulative sum of investment:
+            K[n] = (1 - delta)^n * pce[n] / pce[0] * K[0]
+                   + sum over m < n of
+                     (1 - delta)^(n-1-m) * pce[n] / pce[m] * I[m]
+        Parameters:
+            capital0: array of capital stocks in the first year,
+                      [batch x] asset type
+            investment: array of investment, [batch x] asset type x
+                        year (T)
+            delta: array of economic depreciation rates by asset type
+            pce: array of price index values for years 0 to T
+        Any leading batch axes (such as investment response scenarios)
+        are carried through.
+        Returns arrays of capital stocks, [batch x] asset type x year
+        (T + 1), and true depreciation, [batch x] asset type x year (T).
+        """
+        investment = np.asarray(investment, dtype=float)
+        delta = np.asarray(delta, dtype=float).reshape(-1, 1)
+        pce = np.asarray(pce, dtype=float)
+        nyrs = investment.shape[-1]
+        assert len(pce) == nyrs + 1
+        n = np.arange(nyrs + 1)
+        m = np.arange(nyrs)
+        # Weight of investment in year m in the capital stock in year n
+        weights = np.where(m < n[:, np.newaxis],
+                           (1. - delta[:, :, np.newaxis])
+                           ** np.maximum(n[:, np.newaxis] - 1 - m, 0)
+                           * pce[:, np.newaxis] / pce[:nyrs], 0.)
+        capital = (np.asarray(capital0, dtype=float)[..., np.newaxis]
+                   * (1. - delta) ** n * pce / pce[0]
+                   + np.einsum('anm,...am->...an', weights, investment))
+        trueDep = capital[..., :nyrs] * delta
+        return (capital, trueDep)
 
     def build_capital_history(self):
         """
-        Builds capital history array using investment_history and capital_df
+        Builds capital history array using investment_arr and capital data
         """
         # Get historical capital stock
         if self.corp:
-            capital_dfg = copy.deepcopy(self.data.capital_corp)
+            capital_dfg = self.data.capital_corp
         else:
-            capital_dfg = copy.deepcopy(self.data.capital_noncorp)
-        capital_df1 = capital_dfg[capital_dfg.industry == self.industry]
-        capital_df1.drop(['industry'], axis=1, inplace=True)
-        capital_df1.reset_index(drop=True, inplace=True)
-        capital_df1.rename(columns={'asset_code': 'Code'}, inplace=True)
-        capital_df2 = capital_df1.merge(right=self.data.econ_depr_df(),
-                                        how='outer', on='Code')
-        trueDep_df = copy.deepcopy(self.data.econ_depr_df())
+            capital_dfg = self.data.capital_noncorp
+        capital_hist = self.industry_array(
+            capital_dfg, [str(year) for year in range(HISTORY_START,
+                                                      START_YEAR + 1)])
+        nhist = START_YEAR - HISTORY_START + 1
+        capital = np.zeros(capital_hist.shape[:-1]
+                           + (END_YEAR - HISTORY_START + 2,))
+        capital[..., :nhist] = capital_hist
+        delta = np.asarray(self.data.econ_depr_df()['delta'])
         pcelist = np.asarray(self.data.investmentGfactors_data['pce'])
-        for year in range(START_YEAR, END_YEAR + 1):
-            trueDep_df[str(year)] = capital_df2[str(year)] * trueDep_df['delta']
-            capital_df2[str(year + 1)] = ((capital_df2[str(year)]
-                                           - trueDep_df[str(year)]
-                                           + self.investment_history[str(year)])
-                                          * pcelist[year-HISTORY_START+1]
-                                          / pcelist[year-HISTORY_START])
-        self.capital_history = capital_df2
-        self.trueDep = trueDep_df
+        i0 = START_YEAR - HISTORY_START
+        (capital[..., i0:], trueDep) = Asset.accumulate_capital(
+            capital[..., i0], self.investment_arr[..., i0:], delta,
+            pcelist[i0:END_YEAR - HISTORY_START + 2])
+        self.capital_years = np.arange(HISTORY_START, END_YEAR + 2)
+        self.capital_arr = capital
+        self.trueDep_years = np.arange(START_YEAR, END_YEAR + 1)
+        self.trueDep_arr = trueDep
+        self._views.pop('capital_history', None)
+        self._views.pop('trueDep', None)
+
+    @property
+    def capital_history(self):
+        """
+        DataFrame view of capital_arr, with a column for each year and the
+        asset codes, names and economic depreciation rates.
+        """
+        if 'capital_history' not in self._views:
+            econ_depr = self.data.econ_depr_df()
+            capital_df = pd.DataFrame(
+                self.capital_arr.reshape(-1, len(self.capital_years)),
+                columns=[str(year) for year in self.capital_years])
+            nhist = START_YEAR - HISTORY_START + 1
+            nrows = len(capital_df)
+            capital_df.insert(nhist, 'Code', np.resize(self.asset_codes,
+                                                       nrows))
+            capital_df.insert(nhist + 1, 'Asset',
+                              np.resize(econ_depr['Asset'], nrows))
+            capital_df.insert(nhist + 2, 'delta',
+                              np.resize(econ_depr['delta'], nrows))
+            self.insert_industries(capital_df)
+            self._views['capital_history'] = capital_df
+        return self._views['capital_history']
+
+    @property
+    def trueDep(self):
+        """
+        DataFrame view of trueDep_arr, with a column for each year and the
+        asset names, codes and economic depreciation rates.
+        """
+        if 'trueDep' not in self._views:
+            econ_depr = self.data.econ_depr_df()
+            trueDep_arr = self.trueDep_arr.reshape(-1,
+                                                   len(self.trueDep_years))
+            trueDep_df = pd.DataFrame({
+                col: np.resize(econ_depr[col], len(trueDep_arr))
+                for col in econ_depr})
+            for i, year in enumerate(self.trueDep_years):
+                trueDep_df[str(year)] = trueDep_arr[:, i]
+            self.insert_industries(trueDep_df)
+            self._views['trueDep'] = trueDep_df
+        return self._views['trueDep']
 
     def build_capital_path(self):
         """
@@ -434,26 +696,25 @@ class Asset():
         totals for each year in the budget window.
         """
         # Sum across assets and put into new dataset
-        Kstock_total = np.zeros(NUM_YEARS)
-        trueDep_total = np.zeros(NUM_YEARS)
-        inv_total = np.zeros(NUM_YEARS)
-        Mdep_total = np.zeros(NUM_YEARS)
-        Oded_total = np.zeros(NUM_YEARS)
-        for year in range(START_YEAR, END_YEAR + 1):
-            iyr = year - START_YEAR
-            adjfactor = self.adjustments['rescalar'][iyr]
-            Kstock_total[iyr] = sum(self.capital_history[str(year)]) * adjfactor
-            trueDep_total[iyr] = sum(self.trueDep[str(year)]) * adjfactor
-            inv_total[iyr] = sum(self.investment_history[str(year)]) * adjfactor
-            [depded, otherded] = self.calcDep_oneyear(year)
-            Mdep_total[iyr] = depded * adjfactor
-            Oded_total[iyr] = otherded * adjfactor
-        cap_result = pd.DataFrame({'year': range(START_YEAR, END_YEAR + 1),
-                                   'Kstock': Kstock_total,
-                                   'Investment': inv_total,
-                                   'trueDep': trueDep_total,
-                                   'taxDep': Mdep_total,
-                                   'otherCCR': Oded_total})
+        window = slice(START_YEAR - HISTORY_START,
+                       END_YEAR - HISTORY_START + 1)
+        adjfactor = np.asarray(self.adjustments['rescalar'])
+        Kstock_total = self.capital_arr[..., window].sum(axis=-2) * adjfactor
+        trueDep_total = self.trueDep_arr.sum(axis=-2) * adjfactor
+        inv_total = self.investment_arr[..., window].sum(axis=-2) * adjfactor
+        [depded, otherded] = self.deduction_history.sum(axis=-2)
+        Mdep_total = depded * adjfactor
+        Oded_total = otherded * adjfactor
+        nind = 1 if self.industries is None else len(self.industries)
+        cap_result = pd.DataFrame({'year': np.tile(np.arange(START_YEAR,
+                                                             END_YEAR + 1),
+                                                   nind),
+                                   'Kstock': Kstock_total.reshape(-1),
+                                   'Investment': inv_total.reshape(-1),
+                                   'trueDep': trueDep_total.reshape(-1),
+                                   'taxDep': Mdep_total.reshape(-1),
+                                   'otherCCR': Oded_total.reshape(-1)})
+        self.insert_industries(cap_result)
         self.capital_path = cap_result
 
     def calc_all(self):
@@ -463,6 +724,7 @@ class Asset():
         self.build_inv_matrix()
         self.build_deprLaw_matrices()
         self.build_capital_history()
+        self.build_deduction_history()
         self.build_capital_path()
         return None
 
@@ -494,3 +756,7 @@ class Asset():
         """
         truedep = np.array(self.capital_path['trueDep'])
         return truedep
+
+
+# Depreciation-law arrays are built from the tax depreciation and bonus data
+Data.register_derived_cache(Asset.deprLaw_arrays)
@@ -4,9 +4,10 @@ Business-Taxation BtaxMini class.
 import copy
 import numpy as np
 import pandas as pd
-from biztax.years import START_YEAR, END_YEAR, NUM_YEARS
+from biztax.years import START_YEAR, END_YEAR, NUM_YEARS, HISTORY_START
 from biztax.data import Data
 from biztax.asset import Asset
+from biztax.parallel import get_executor, num_tasks
 
 
 class BtaxMini():
@@ -19,15 +20,32 @@ class BtaxMini():
     Parameters
     ----------
     btax_params: DataFrame of regular tax parameters
+    analytic: if True, present values are evaluated in closed form over
+              segments of constant tax rates, with no truncation of the
+              lifetime; if False, they are summed over the grid of annual
+              periods (where depreciation ends with the final period)
 
     Returns
     -------
     DataFrame of user cost of capital and EATR for each year and asset type
     """
+    # Measures calculated for each asset type and year
+    MEASURES = ['u_c', 'u_nc', 'eatr_c', 'eatr_nc']
 
-    def __init__(self, btax_params):
+    # Policy parameters (columns of btax_params) the results depend on
+    PARAM_COLUMNS = (['year', 'tau_c', 'tau_nc',
+                      'intPaid_corp_hc', 'newIntPaid_corp_hcyear',
+                      'newIntPaid_corp_hc', 'intPaid_noncorp_hc',
+                      'newIntPaid_noncorp_hcyear', 'newIntPaid_noncorp_hc',
+                      'depr_file'] +
+                     ['depr_{}yr_{}'.format(y if y != 27.5 else 275, s)
+                      for y in Asset.DEPR_CLASSES
+                      for s in ['method', 'bonus']])
+
+    def __init__(self, btax_params, analytic=True):
         self.econ_params = copy.deepcopy(Data().econ_defaults)
         self.btax_params = btax_params
+        self.analytic = analytic
         self.asset_c = Asset(btax_params, corp=True)
         self.asset_c.build_deprLaw_matrices()
 
@@ -288,39 +306,41 @@ class BtaxMini():
     def calc_Dlist(self, method, life, delta, r, pi, bonus, length=50):
         """
         Calculates present value of depreciation deductions over lifetime.
-            method: depreciation method to use
+            method: depreciation method to use (name or Asset method code)
             life: tax life
             delta: depreciation rate
             r: discount rate
             pi: inflation rate
             bonus: bonus depreciation rate
             length: number of periods to use
+        method, life, delta and bonus may also be arrays by asset type,
+        in which case there is one row of deductions for each asset type.
+        Each distinct set of rules is calculated only once.
         """
         # Check that methods are acceptable
-        assert method in ['DB 200%', 'DB 150%', 'SL',
-                          'Economic', 'Expensing', 'None']
+        code = Asset.method_code(method)
+        (code, life, delta, bonus) = np.broadcast_arrays(code, life,
+                                                         delta, bonus)
         # Check bonus depreciation rates
-        assert bonus >= 0 and bonus <= 1
+        assert ((bonus >= 0) & (bonus <= 1)).all()
         if type(length) != int:
             length = int(length)
-        if method == 'DB 200%':
-            # Double-declining (200%) balance depreciation
-            Dlist = self.calc_Dlist_dbsl(2, life, bonus, r, pi, length)
-        elif method == 'DB 150%':
-            # 150% declining balance depreciation
-            Dlist = self.calc_Dlist_dbsl(1.5, life, bonus, r, pi, length)
-        elif method == 'SL':
-            # Straight-line depreciation
-            Dlist = self.calc_Dlist_dbsl(1.0, life, bonus, r, pi, length)
-        elif method == 'Economic':
-            # Economic depreciation
-            Dlist = self.calc_Dlist_econ(delta, r, bonus, length)
-        elif method == 'Expensing':
-            # Expensing
-            Dlist = self.calc_Dlist_exp(length)
-        else:
-            # No depreciation
-            Dlist = np.zeros(length)
+        Dlist = np.zeros(code.shape + (length,))
+        # Expensing
+        Dlist[code == Asset.METHODS.index('Expensing')] = (
+            self.calc_Dlist_exp(length))
+        # Declining balance and straight-line depreciation
+        for name, N in Asset.DBSL_RATES.items():
+            mask = (code == Asset.METHODS.index(name))
+            for (L, bon) in set(zip(life[mask], bonus[mask])):
+                Dlist[mask & (life == L) & (bonus == bon)] = (
+                    self.calc_Dlist_dbsl(N, L, bon, r, pi, length))
+        # Economic depreciation
+        mask = (code == Asset.METHODS.index('Economic'))
+        for (d, bon) in set(zip(delta[mask], bonus[mask])):
+            Dlist[mask & (delta == d) & (bonus == bon)] = (
+                self.calc_Dlist_econ(d, r, bon, length))
+        # No depreciation is left at zero
         return Dlist
 
     def calc_Tlist(self, tdict, length=50):
@@ -360,6 +380,57 @@ class BtaxMini():
                     Tlist.append(ratelist[rateind])
         return Tlist
 
+    def calc_pv_depr(self, method, life, delta, r, pi, bonus, Tlist,
+                     length=50, bounds=None):
+        """
+        Calculates the present value of the tax shield from depreciation,
+        sum(Dlist * Tlist), for one depreciation profile.
+            bounds: (start, end) of the segments with tax rates Tlist,
+                    or None for the grid of periods
+        """
+        code = int(Asset.method_code(method))
+        if bounds is None:
+            Dlist = np.asarray(self.calc_Dlist(code, life, delta,
+                                               r, pi, bonus, length))
+        else:
+            Dlist = self.calc_Darray(code, life, delta, r, pi, bonus,
+                                     length, bounds)
+        return sum(Dlist * np.asarray(Tlist))
+
+    def calc_pv_sums(self, r, pi, delta, method, life, bonus, f, rd, fracded,
+                     tdict, length=50):
+        """
+        Calculates the present values used for the cost of capital and EATR
+            A: tax shield from depreciation
+            F: tax shield from interest deduction
+            N: gross income net-of-tax rate
+        The arguments are as for calc_rho.
+        """
+        if self.analytic:
+            # Get segments of constant tax rates
+            (a, b, Tlist) = self.calc_segments(tdict)
+            bounds = (a, b)
+            # Get income and interest deductions for each segment
+            Nlist = self.calc_Iarray(delta, r, length, bounds)
+            Flist = self.calc_Farray(f, r, rd, delta, fracded, length, bounds)
+        else:
+            bounds = None
+            # Get tax rates for all periods
+            Tlist = np.asarray(self.calc_Tlist(tdict, length))
+            # Get income rates for all periods
+            Nlist = np.asarray(self.calc_Ilist(delta, r, length))
+            # Get interest deductions for all periods
+            Flist = np.asarray(self.calc_Flist(f, r, rd, delta, fracded,
+                                               length))
+        # Present value of tax shield from depreciation
+        A = self.calc_pv_depr(method, life, delta, r, pi, bonus, Tlist,
+                              length, bounds)
+        # Present value of tax shield from interest deduction
+        F = sum(Flist * Tlist)
+        # Present value of gross income net-of-tax rate
+        N = sum(Nlist * (1 - Tlist))
+        return (A, F, N)
+
     def calc_rho(self, r, pi, delta, method, life, bonus, f, rd, fracded,
                  tdict, length=50):
         """
@@ -376,21 +447,8 @@ class BtaxMini():
             tdict: dict of tax rates and changes
             length: number of periods to use
         """
-        # Get tax rates for all periods
-        Tlist = np.asarray(self.calc_Tlist(tdict, length))
-        # Get income rates for all periods
-        Nlist = np.asarray(self.calc_Ilist(delta, r, length))
-        # Get depreciation deductions for all periods
-        Dlist = np.asarray(self.calc_Dlist(method, life, delta,
-                                           r, pi, bonus, length))
-        # Get interest deductions for all periods
-        Flist = np.asarray(self.calc_Flist(f, r, rd, delta, fracded, length))
-        # Present value of tax shield from depreciation
-        A = sum(Dlist * Tlist)
-        # Present value of tax shield from interest deduction
-        F = sum(Flist * Tlist)
-        # Present value of gross income net-of-tax rate
-        N = sum(Nlist * (1 - Tlist))
+        (A, F, N) = self.calc_pv_sums(r, pi, delta, method, life, bonus,
+                                      f, rd, fracded, tdict, length)
         rho = (1 - A - F) / N - delta
         return rho
 
@@ -424,10 +482,11 @@ class BtaxMini():
             rho_inv = 0.5 * (rho_fifo + rho_lifo)
         return rho_inv
 
-    def calc_eatr(self, p, r, pi, delta, method, life, bonus, f, rd, fracded,
-                  tdict, length=50):
+    def calc_rho_eatr(self, p, r, pi, delta, method, life, bonus, f, rd,
+                      fracded, tdict, length=50):
         """
-        Calculates the effective average tax rate on investment
+        Calculates the cost of capital and the effective average tax rate on
+        investment from one set of present values.
             p: financial income rate
             r: discount rate
             pi: inflation rate
@@ -440,27 +499,42 @@ class BtaxMini():
             fracded: fraction of interest paid deductible
             tdict: dict of tax rates and changes
             length: number of periods to use
+        Returns (rho, eatr)
         """
+        (A, F, N) = self.calc_pv_sums(r, pi, delta, method, life, bonus,
+                                      f, rd, fracded, tdict, length)
         # Calculate the cost of capital
-        coc = self.calc_rho(r, pi, delta, method, life, bonus, f, rd, fracded,
-                            tdict, length)
+        coc = (1 - A - F) / N - delta
         # Check that the financial income rate exceess the cost of capital
         assert p >= coc
         # Rent in the absence of tax
         Rstar = (p - r) / (r + delta)
         # Income stream
         P = p / (r + delta)
-        Tlist = np.asarray(self.calc_Tlist(tdict, length))
-        Nlist = np.asarray(self.calc_Ilist(delta, r, length))
-        Dlist = np.asarray(self.calc_Dlist(method, life, delta,
-                                           r, pi, bonus, length))
-        Flist = np.asarray(self.calc_Flist(f, r, rd, delta, fracded, length))
-        A = sum(Dlist * Tlist)
-        F = sum(Flist * Tlist)
-        N = sum(Nlist * (1 - Tlist))
         # Calculate after-tax rent
         R = -(1 - A - F) + (p + delta) * N
         eatr = (Rstar - R) / P
+        return (coc, eatr)
+
+    def calc_eatr(self, p, r, pi, delta, method, life, bonus, f, rd, fracded,
+                  tdict, length=50):
+        """
+        Calculates the effective average tax rate on investment
+            p: financial income rate
+            r: discount rate
+            pi: inflation rate
+            delta: depreciation rate
+            method: depreciation method
+            life: tax life
+            bonus: bonus depreciation rate
+            f: debt to asset ratio
+            rd: interest rate on debt
+            fracded: fraction of interest paid deductible
+            tdict: dict of tax rates and changes
+            length: number of periods to use
+        """
+        (_, eatr) = self.calc_rho_eatr(p, r, pi, delta, method, life, bonus,
+                                       f, rd, fracded, tdict, length)
         return eatr
 
     def calc_usercost(self, r, pi, delta, method, life, bonus, f, rd, fracded,
@@ -485,72 +559,367 @@ class BtaxMini():
         ucoc = coc + delta
         return ucoc
 
+    @staticmethod
+    def period_bounds(length=50, tail=True):
+        """
+        Returns arrays of the start and end of each period in the lifetime:
+        the first (half) year, then years centered on 1, ..., length-1.
+            length: number of periods to use
+            tail: if True, the final period extends to infinity
+        """
+        a = np.arange(length) - 0.5
+        a[0] = 0.
+        b = np.arange(length) + 0.5
+        if tail:
+            b[-1] = 9e99
+        return (a, b)
+
+    def calc_segments(self, tdict):
+        """
+        Splits the lifetime into segments of constant statutory tax rate,
+        with the rate changes timed as in calc_Tlist.
+            tdict: dictionary of tax rates and when they become effective
+        Returns arrays of the start, end and tax rate of each segment; the
+        final segment extends to infinity.
+        """
+        assert len(tdict) > 0
+        changelist = sorted(int(key) for key in tdict)
+        # Keep only the changes that change the rate
+        segments = [changelist[0]]
+        for chg in changelist[1:]:
+            if tdict[str(chg)] != tdict[str(segments[-1])]:
+                segments.append(chg)
+        a = np.array([0.] + [chg - 0.5 for chg in segments[1:]])
+        b = np.append(a[1:], 9e99)
+        T = np.array([tdict[str(chg)] for chg in segments], dtype=float)
+        return (a, b, T)
+
+    def calc_Iarray(self, delta, r, length=50, bounds=None):
+        """
+        Array version of calc_Ilist: present value of income unit in each
+        period, for arrays of depreciation rates and discount rates.
+            delta: depreciation rate
+            r: discount rate
+            length: number of periods to use
+            bounds: (start, end) arrays of the intervals to use instead of
+                    the periods, such as from calc_segments
+        Arguments are broadcast against each other, and the periods are
+        added as a final axis.
+        """
+        if bounds is None:
+            bounds = self.period_bounds(length)
+        (a, b) = bounds
+        k = np.asarray(r + delta, dtype=float)[..., np.newaxis]
+        ksafe = np.where(k == 0, 1., k)
+        inv = np.where(k == 0, b - a,
+                       1 / ksafe * np.exp(-ksafe * a) *
+                       (1 - np.exp(-ksafe * (b - a))))
+        return inv
+
+    def calc_Farray(self, f, r, i, delta, fracded, length=50, bounds=None):
+        """
+        Array version of calc_Flist: present value of interest deduction in
+        each period, for arrays of the arguments to calc_F.
+        Arguments are broadcast against each other, and the periods (or
+        intervals given by bounds, as in calc_Iarray) are added as a final
+        axis.
+        """
+        if bounds is None:
+            bounds = self.period_bounds(length)
+        (a, b) = bounds
+        k = np.asarray(r + delta, dtype=float)[..., np.newaxis]
+        F = (np.asarray(f * i, dtype=float)[..., np.newaxis] / k
+             * np.asarray(fracded, dtype=float)[..., np.newaxis]
+             * np.exp(-k * a) * (1 - np.exp(-k * (b - a))))
+        return F
+
+    def calc_Darray_dbsl(self, N, L, r, pi, length=50, bounds=None):
+        """
+        Array version of calc_D_dbsl over all periods in the lifetime,
+        before bonus depreciation.
+            N: exponential depreciation rate (2, 1.5 or 1)
+            L: tax life
+            r: discount rate
+            pi: inflation rate
+            length: number of periods to use
+            bounds: (start, end) arrays of the intervals to use instead of
+                    the periods, which may span the switching point and the
+                    end of the tax life
+        Arguments are broadcast against each other, and the periods are
+        added as a final axis.
+        """
+        if bounds is None:
+            (a, b) = self.period_bounds(length, tail=False)
+        else:
+            (a, b) = bounds
+        N = np.asarray(N, dtype=float)[..., np.newaxis]
+        L = np.asarray(L, dtype=float)[..., np.newaxis]
+        rp = np.asarray(r + pi, dtype=float)[..., np.newaxis]
+        rpsafe = np.where(rp == 0, 1., rp)
+        k = rp + N / L
+        # Switching point and end of tax life
+        t1 = L * (1 - 1 / N)
+        t2 = L
+        # Exponential depreciation until the switching point
+        hi = np.minimum(b, t1)
+        if bounds is None:
+            lo = a
+        else:
+            lo = np.minimum(a, t1)
+        Ddb = N / L / k * np.exp(-k * lo) * (1 - np.exp(-k * (hi - lo)))
+        # Straight-line depreciation, from the switching point if the
+        # period ends before the end of the tax life
+        hi = np.minimum(b, t2)
+        if bounds is None:
+            lo = np.where(b <= t2, np.maximum(a, t1), a)
+        else:
+            lo = np.minimum(np.maximum(a, t1), hi)
+        Dsl = np.where(rp == 0, np.exp(1 - N) * (hi - lo) / (t2 - t1),
+                       N / L / rpsafe * np.exp(1 - N) *
+                       np.exp(-rpsafe * lo) *
+                       (1 - np.exp(-rpsafe * (hi - lo))))
+        if bounds is None:
+            D = np.where(b <= t1, Ddb,
+                         np.where(b <= t2, np.where(a < t1, Ddb, 0.) + Dsl,
+                                  np.where(a < t2, Dsl, 0.)))
+        else:
+            D = Ddb + Dsl
+        return D
+
+    def calc_Darray(self, method, life, delta, r, pi, bonus, length=50,
+                    bounds=None):
+        """
+        Array version of calc_Dlist: present value of depreciation
+        deductions in each period of the lifetime.
+            method: depreciation method (name or Asset method code)
+            life: tax life
+            delta: depreciation rate
+            r: discount rate
+            pi: inflation rate
+            bonus: bonus depreciation rate
+            length: number of periods to use
+            bounds: (start, end) arrays of the intervals to use instead of
+                    the periods, the first starting at 0
+        Arguments are broadcast against each other, and the periods are
+        added as a final axis.
+        """
+        code = Asset.method_code(method)
+        (code, life, delta, r, pi, bonus) = np.broadcast_arrays(
+            code, life, delta, r, pi, bonus)
+        assert ((bonus >= 0) & (bonus <= 1)).all()
+        # Declining balance and straight-line depreciation
+        N = np.ones(code.shape)
+        for name, rate in Asset.DBSL_RATES.items():
+            N[code == Asset.METHODS.index(name)] = rate
+        dbsl = np.isin(code, [Asset.METHODS.index(name)
+                              for name in Asset.DBSL_RATES])
+        D = np.where(dbsl[..., np.newaxis],
+                     self.calc_Darray_dbsl(N, np.where(dbsl, life, 1.),
+                                           r, pi, length, bounds), 0.)
+        # Economic depreciation
+        econ = (code == Asset.METHODS.index('Economic'))[..., np.newaxis]
+        if bounds is None:
+            bounds = self.period_bounds(length)
+        (a, b) = bounds
+        k = (r + delta)[..., np.newaxis]
+        ksafe = np.where(k == 0, 1., k)
+        Decon = np.where(k == 0, delta[..., np.newaxis] * (b - a),
+                         delta[..., np.newaxis] / ksafe *
+                         np.exp(-ksafe * a) * (1 - np.exp(-ksafe * (b - a))))
+        D = np.where(econ, Decon, D)
+        # Bonus depreciation
+        D = (1 - bonus)[..., np.newaxis] * D
+        D[..., 0] += bonus
+        # Expensing
+        exp = (code == Asset.METHODS.index('Expensing'))
+        D[exp] = 0.
+        D[..., 0][exp] = 1.
+        # No depreciation is left at zero
+        D[code == Asset.METHODS.index('None')] = 0.
+        return D
+
+    def calc_Tarray(self, yearlist, corp=True, length=50):
+        """
+        Builds the statutory tax rates for each period in the lifetime of
+        investment made in each year of yearlist, as a (year x period) array.
+        """
+        if corp:
+            make_tdict = self.make_tdict_c
+        else:
+            make_tdict = self.make_tdict_nc
+        return np.array([self.calc_Tlist(make_tdict(year), length)
+                         for year in yearlist], dtype=float)
+
+    def calc_Tsegments(self, yearlist):
+        """
+        Builds the segments of constant statutory tax rates in the lifetime
+        of investment made in each year of yearlist, for corporations and
+        noncorporate businesses.
+        Returns the start, end and tax rate of each segment as
+        (sector x year x segment) arrays. Years with fewer rate changes are
+        padded with empty segments at infinity.
+        """
+        segments = [[self.calc_segments(make_tdict(year))
+                     for year in yearlist]
+                    for make_tdict in [self.make_tdict_c, self.make_tdict_nc]]
+        nseg = max(len(seg[2]) for segs in segments for seg in segs)
+        a = np.full((2, len(yearlist), nseg), 9e99)
+        b = np.full((2, len(yearlist), nseg), 9e99)
+        T = np.zeros((2, len(yearlist), nseg))
+        for i, segs in enumerate(segments):
+            for j, seg in enumerate(segs):
+                n = len(seg[2])
+                (a[i, j, :n], b[i, j, :n], T[i, j, :n]) = seg
+        return (a, b, T)
+
+    def calc_arrays(self, yearlist, p=0.2, length=50):
+        """
+        Calculates the cost of capital, user cost of capital and EATR for
+        every asset type, for each year in yearlist, for corporations and
+        noncorporate businesses at once.
+        The present values of income, depreciation and interest deductions
+        are evaluated as (sector x asset x year x period) arrays in one pass,
+        where the periods are segments of constant tax rates if analytic.
+            p: financial income rate used for the EATR
+            length: number of periods to use
+        Returns rho, user cost and EATR as (sector x asset x year) arrays,
+        with corporations first along the sector axis.
+        """
+        yearlist = [int(year) for year in yearlist]
+        for year in yearlist:
+            assert year in range(2017, END_YEAR+1)
+        # Economic parameters and interest deductibility by sector and year
+        econ = np.array([self.get_econ_params_oneyear(year)
+                         for year in yearlist]).T
+        (r_c, r_nc, r_d, pi, f_c, f_nc) = econ
+        fracded = np.array([self.calc_frac_ded(year)
+                            for year in yearlist], dtype=float).T
+        r = np.array([r_c, r_nc])[:, np.newaxis, :]
+        f = np.array([f_c, f_nc])[:, np.newaxis, :]
+        fracded = fracded[:, np.newaxis, :]
+        pi = pi[np.newaxis, np.newaxis, :]
+        r_d = r_d[np.newaxis, np.newaxis, :]
+        # Tax rates by sector, year and period
+        if self.analytic:
+            (a, b, T) = self.calc_Tsegments(yearlist)
+            bounds = (a[:, np.newaxis], b[:, np.newaxis])
+        else:
+            T = np.array([self.calc_Tarray(yearlist, True, length),
+                          self.calc_Tarray(yearlist, False, length)])
+            bounds = None
+        T = T[:, np.newaxis]
+        # Tax depreciation rules by asset and year
+        iyrs = np.array(yearlist) - HISTORY_START
+        method = self.asset_c.method_codes[:, iyrs]
+        life = self.asset_c.life_history[:, iyrs]
+        bonus = self.asset_c.bonus_history[:, iyrs]
+        asset_data = Data().taxdep_info_gross('pre2017')
+        delta = np.array(asset_data['delta'],
+                         dtype=float)[np.newaxis, :, np.newaxis]
+        # The final periods of exponential decay underflow to zero
+        with np.errstate(under='ignore'):
+            Nlist = self.calc_Iarray(delta, r, length, bounds)
+            Dlist = self.calc_Darray(method, life, delta, r, pi,
+                                     bonus, length, bounds)
+            Flist = self.calc_Farray(f, r, r_d, delta, fracded, length,
+                                     bounds)
+        # Present values of tax shields and net-of-tax income
+        A = np.sum(Dlist * T, axis=-1)
+        F = np.sum(Flist * T, axis=-1)
+        N = np.sum(Nlist * (1 - T), axis=-1)
+        rho = (1 - A - F) / N - delta
+        uc = rho + delta
+        # Check that the financial income rate exceeds the cost of capital
+        assert (p >= rho).all()
+        Rstar = (p - r) / (r + delta)
+        P = p / (r + delta)
+        R = -(1 - A - F) + (p + delta) * N
+        eatr = (Rstar - R) / P
+        return (rho, uc, eatr)
+
     def calc_oneyear(self, year):
         """
         In the given year, calculates EATR and user cost of capital for each
         asset type.
         """
-        # Check that year has acceptable value
-        assert year in range(2017, END_YEAR+1)
-        # Extract economic parameters
-        [r_c, r_nc, r_d, pi, f_c, f_nc] = self.get_econ_params_oneyear(year)
-        # Extract tax depreciation information
-        iyr = year - 1960
-        Method = self.asset_c.method_history[iyr]
-        Life = self.asset_c.life_history[:, iyr]
-        Bonus = self.asset_c.bonus_history[:, iyr]
-        # Make tax rate dictionaries
-        tdict_c = self.make_tdict_c(year)
-        tdict_nc = self.make_tdict_nc(year)
-        # Create base DataFrame and get depreciation rates
+        # Create base DataFrame
         asset_data = copy.deepcopy(Data().taxdep_info_gross('pre2017'))
         asset_data.drop(['L_gds', 'L_ads', 'Method'], axis=1, inplace=True)
-        Delta = np.array(asset_data['delta'])
-        # Get deductible fractions of interest paid
-        (fracded_c, fracded_nc) = self.calc_frac_ded(year)
-        # Get inventory method
-        assets = np.asarray(asset_data['Asset'])
-        uc_c = np.zeros(len(assets))
-        uc_nc = np.zeros(len(assets))
-        eatr_c = np.zeros(len(assets))
-        eatr_nc = np.zeros(len(assets))
-        for j in range(len(asset_data)):
-            uc_c[j] = self.calc_usercost(r_c, pi, Delta[j], Method[j],
-                                         Life[j], Bonus[j], f_c, r_d,
-                                         fracded_c, tdict_c, 50)
-            uc_nc[j] = self.calc_usercost(r_nc, pi, Delta[j], Method[j],
-                                          Life[j], Bonus[j], f_nc, r_d,
-                                          fracded_nc, tdict_nc, 50)
-            eatr_c[j] = self.calc_eatr(0.2, r_c, pi, Delta[j], Method[j],
-                                       Life[j], Bonus[j], f_c, r_d,
-                                       fracded_c, tdict_c, length=50)
-            eatr_nc[j] = self.calc_eatr(0.2, r_nc, pi, Delta[j], Method[j],
-                                        Life[j], Bonus[j], f_nc, r_d,
-                                        fracded_nc, tdict_nc, length=50)
+        (_, uc, eatr) = self.calc_arrays([year])
         # Save the results to the main DataFrame
-        asset_data['uc_c'] = uc_c
-        asset_data['uc_nc'] = uc_nc
-        asset_data['eatr_c'] = eatr_c
-        asset_data['eatr_nc'] = eatr_nc
+        asset_data['uc_c'] = uc[0, :, 0]
+        asset_data['uc_nc'] = uc[1, :, 0]
+        asset_data['eatr_c'] = eatr[0, :, 0]
+        asset_data['eatr_nc'] = eatr[1, :, 0]
         return asset_data
 
-    def run_btax_mini(self, yearlist):
+    def submit_results(self, executor, yearlist, max_workers=None):
+        """
+        Submits calc_results to the executor for yearlist split into
+        contiguous chunks, one for each of max_workers workers (see
+        parallel.num_tasks), so that each task keeps the years batched.
+        Returns the list of futures, whose results concatenated along the
+        year axis are in the order of yearlist.
+        """
+        yearlist = list(yearlist)
+        nchunks = min(len(yearlist), num_tasks(max_workers))
+        return [executor.submit(self.calc_results,
+                                [int(year) for year in chunk])
+                for chunk in np.array_split(yearlist, nchunks)]
+
+    def calc_results(self, yearlist, executor=None, max_workers=None):
+        """
+        Calculates the user cost of capital and EATR for each asset type,
+        for each year in yearlist.
+            executor: if not None, chunks of years are calculated in
+                      parallel (see parallel.get_executor and
+                      submit_results)
+            max_workers: number of workers (None for the number of
+                         processors)
+        Returns an (asset x year x measure) array, with the measures in the
+        order of BtaxMini.MEASURES.
+        """
+        yearlist = list(yearlist)
+        if executor is not None and len(yearlist) > 1:
+            with get_executor(executor, max_workers) as pool:
+                futures = self.submit_results(pool, yearlist, max_workers)
+                return np.concatenate([future.result() for future in futures],
+                                      axis=1)
+        if len(yearlist) == 0:
+            nassets = len(self.asset_c.method_codes)
+            return np.zeros((nassets, 0, len(BtaxMini.MEASURES)))
+        (_, uc, eatr) = self.calc_arrays(yearlist)
+        return np.stack([uc[0], uc[1], eatr[0], eatr[1]], axis=-1)
+
+    def run_btax_mini(self, yearlist, tidy=False, executor=None,
+                      max_workers=None):
         """
         Runs the code to compute the user cost and EATR
         for each asset type for each year in yearlist.
-        """
-        basedata = copy.deepcopy(Data().taxdep_info_gross('pre2017'))
+        Returns a DataFrame of asset information with a column for each
+        measure and year (such as 'u_c2017'), or if tidy, a long DataFrame
+        with a row for each asset and year and a column for each measure.
+        The years may be calculated in parallel using executor and
+        max_workers, as for calc_results.
+        """
+        yearlist = list(yearlist)
+        results = self.calc_results(yearlist, executor, max_workers)
+        basedata = Data().taxdep_info_gross('pre2017')
         basedata.drop(['L_gds', 'L_ads', 'Method'], axis=1, inplace=True)
-        for year in yearlist:
-            # Get calculations for each year
-            results_oneyear = self.calc_oneyear(year)
-            # Rename to include the year calculated
-            results_oneyear.rename(columns={'uc_c': 'u_c' + str(year),
-                                            'uc_nc': 'u_nc' + str(year),
-                                            'eatr_c': 'eatr_c' + str(year),
-                                            'eatr_nc': 'eatr_nc' + str(year)},
-                                   inplace=True)
-            # Merge year's results into combined DataFrame
-            basedata = basedata.merge(right=results_oneyear,
-                                      how='outer', on='Asset')
-        return basedata
+        if tidy:
+            tidydata = pd.DataFrame({
+                'Asset': np.repeat(np.asarray(basedata['Asset']),
+                                   len(yearlist)),
+                'year': np.tile(np.asarray(yearlist, dtype=int),
+                                len(basedata))
+            })
+            for k, measure in enumerate(BtaxMini.MEASURES):
+                tidydata[measure] = results[:, :, k].ravel()
+            return tidydata
+        columns = dict()
+        for iyr, year in enumerate(yearlist):
+            for k, measure in enumerate(BtaxMini.MEASURES):
+                columns[measure + str(year)] = results[:, iyr, k]
+        return pd.concat([basedata, pd.DataFrame(columns,
+                                                 index=basedata.index)],
+                         axis=1)
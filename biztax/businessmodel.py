@@ -4,10 +4,13 @@ import pandas as pd
 import taxcalc as itax
 from biztax.years import START_YEAR, END_YEAR, NUM_YEARS
 from biztax.policy import Policy
+from biztax.data import Data
+from biztax.asset import Asset
 from biztax.investor import Investor
 from biztax.corporation import Corporation
 from biztax.passthrough import PassThrough
 from biztax.response import Response
+from biztax.parallel import get_executor, num_tasks
 
 
 class BusinessModel():
@@ -21,7 +24,9 @@ class BusinessModel():
         PassThrough
         Investor
     Furthermore, the BusinessModel uses a Response object when the
-    calc_all method is called with a Response object as an argument.
+    calc_all method is called with a Response object as an argument, and
+    calc_elasticity_sweep compares the results for several sets of
+    elasticities.
 
     It is important to note that the inclusion of both baseline and reform
     Policy objects in the constructor is important: the necessity of both
@@ -35,12 +40,22 @@ class BusinessModel():
         btax_policy_base: Business-Taxation Policy object for btax baseline
         itax_policy_base: Tax-Calculator Policy object for itax baseline
         investor_data: filename or DataFrame containing individual sample
+        industries: None, or a list of industry codes (or 'all') for which
+                    calc_all also produces industry_capital_paths, the
+                    Asset results by industry (see
+                    calc_industry_capital_paths)
+        executor: None to calculate the industry capital paths in this
+                  process, or 'thread', 'process' or a concurrent.futures
+                  Executor to split them across workers (see
+                  parallel.get_executor)
+        max_workers: number of workers (None for the number of processors)
     """
 
     def __init__(self, btax_policy_ref, itax_policy_ref,
                  # baseline defaults are current-law policy
                  btax_policy_base=Policy(), itax_policy_base=itax.Policy(),
-                 investor_data='puf.csv'):
+                 investor_data='puf.csv', industries=None, executor=None,
+                 max_workers=None):
         # Check policy argument types
         assert isinstance(btax_policy_ref, Policy)
         assert isinstance(itax_policy_ref, itax.Policy)
@@ -52,15 +67,29 @@ class BusinessModel():
         # Create btax policy parameters DataFrame objects
         self.btax_params_base = btax_policy_base.parameters_dataframe()
         self.btax_params_ref = btax_policy_ref.parameters_dataframe()
-        # Create Corporations
+        # Create Corporations (the reform reusing the baseline deductions)
         self.corp_base = Corporation(self.btax_params_base)
-        self.corp_ref = Corporation(self.btax_params_ref)
+        self.corp_ref = Corporation(self.btax_params_ref,
+                                    baseline=self.corp_base)
         # Create PassThroughs
         self.passthru_base = PassThrough(self.btax_params_base)
-        self.passthru_ref = PassThrough(self.btax_params_ref)
+        self.passthru_ref = PassThrough(self.btax_params_ref,
+                                        baseline=self.passthru_base)
+        # Industry breakdown options
+        if industries is None or industries == 'all':
+            self.industries = industries
+        elif (isinstance(industries, (list, tuple)) and len(industries) > 0
+              and all(isinstance(ind, str) for ind in industries)):
+            self.industries = list(industries)
+        else:
+            raise ValueError('industries must be None, a list or \'all\'')
+        self.executor = executor
+        self.max_workers = max_workers
         # Declare calculated results objects
         self.multipliers = None
         self.model_results = None
+        self.industry_capital_paths = None
+        self.sweep_results = None
 
     def calc_all(self, response=None):
         """
@@ -97,6 +126,85 @@ class BusinessModel():
         self.investor_base.undistributed_revenue()
         # Calculate and save total revenue changes
         self.calc_revenue_changes()
+        # Calculate capital paths by industry
+        if self.industries is not None:
+            self.calc_industry_capital_paths()
+
+    def calc_elasticity_sweep(self, elasticities_list, executor=None,
+                              max_workers=None):
+        """
+        Executes the BusinessModel calculations with response for each of
+        several sets of elasticities. The static calculations, the MTRs and
+        the parts of the responses that do not depend on the elasticities
+        (costs of capital, EATRs, tax shields and repatriation penalties)
+        are calculated once, and only the responses and what depends on
+        them are recalculated for each set.
+
+        Parameters:
+          elasticities_list: list of dictionaries of elasticity values, each
+                             used to update the default elasticities
+          executor, max_workers: executor options for the Response
+                                 (see Response)
+
+        Returns (and saves as sweep_results) a DataFrame stacking the
+        model_results for each set, with a scenario column giving the
+        position of the set in elasticities_list and a column for each
+        elasticity named in any set. Industry capital paths are not
+        calculated.
+        """
+        if (not isinstance(elasticities_list, (list, tuple)) or
+                len(elasticities_list) == 0 or
+                not all(isinstance(elast, dict)
+                        for elast in elasticities_list)):
+            raise ValueError('elasticities_list must be a nonempty list '
+                             'of dictionaries')
+        # Check all the elasticities before calculating anything
+        responses = list()
+        for elast in elasticities_list:
+            response = Response(executor=executor,
+                                max_workers=max_workers)
+            response.update_elasticities(elast)
+            responses.append(response)
+        # Run static calculations for baseline and reform
+        self.corp_base.calc_static()
+        self.passthru_base.calc_static()
+        self.corp_ref.calc_static()
+        self.passthru_ref.calc_static()
+        corp_static = self.corp_ref
+        passthru_static = self.passthru_ref
+        # Calculate the elasticity-independent parts of the responses once,
+        # from the earliest first_year_response of any set
+        self.update_mtrlists()
+        firstyear = min(response.elasticities['first_year_response']
+                        for response in responses)
+        responses[0].calc_inputs(self.btax_params_base, self.btax_params_ref,
+                                 firstyear)
+        # Calculate baseline investor without distributing
+        self.investor_base.undistributed_revenue()
+        swept = sorted(set().union(*elasticities_list))
+        results = list()
+        for scenario, response in enumerate(responses):
+            response.inputs = responses[0].inputs
+            response.calc_responses()
+            # Apply the responses to a copy of the static reform (sharing,
+            # not copying, the baseline Assets)
+            self.corp_ref = copy.deepcopy(
+                corp_static, {id(self.corp_base.asset): self.corp_base.asset})
+            self.passthru_ref = copy.deepcopy(
+                passthru_static,
+                {id(self.passthru_base.asset): self.passthru_base.asset})
+            self.corp_ref.apply_responses(response)
+            self.passthru_ref.apply_responses(response)
+            self.produce_multipliers()
+            self.investor_ref.distribute_results(self.multipliers)
+            self.calc_revenue_changes()
+            result = self.model_results.copy()
+            result.insert(0, 'scenario', scenario)
+            for key in swept:
+                result[key] = response.elasticities[key]
+            results.append(result)
+        self.sweep_results = pd.concat(results, ignore_index=True)
+        return self.sweep_results
 
     def produce_multipliers(self):
         # Get corporate net after-tax incomes
@@ -155,6 +263,95 @@ class BusinessModel():
                                            'ITax_change': indivrev_change,
                                            'AllTax_change': alltax_change})
 
+    def calc_industry_capital_paths(self):
+        """
+        Calculates the Asset results for each industry: the capital stock,
+        investment, true depreciation, tax depreciation and other CCR
+        (the columns of Asset.capital_path), for corporations and
+        pass-throughs under the baseline and the reform (with the investment
+        response and rescaling already applied to the reform objects).
+        Only the capital paths are broken down by industry: Corporation and
+        PassThrough (debt, earnings and taxes) are only run for each sector
+        as a whole, and model_results has no industry detail.
+        Without an executor, all industries in a sector are calculated
+        together in one Asset. With an executor, the industries are split
+        into chunks so that there is one task (a sector and a chunk) for
+        each of max_workers workers, and the results are combined in a
+        fixed order into the industry_capital_paths DataFrame.
+        """
+        if self.industries == 'all':
+            industries = list(pd.unique(Data().investment_corp['industry']))
+        else:
+            industries = self.industries
+        sectors = [('corp', True, self.corp_base, self.corp_ref),
+                   ('noncorp', False, self.passthru_base, self.passthru_ref)]
+        with get_executor(self.executor, self.max_workers) as executor:
+            if executor is None:
+                nchunks = 1
+            else:
+                nworkers = num_tasks(self.max_workers)
+                nchunks = min(len(industries),
+                              max(1, nworkers // len(sectors)))
+            chunks = [industries[i::nchunks] for i in range(nchunks)]
+            tasks = list()
+            for (sector, corp, base, ref) in sectors:
+                for chunk in chunks:
+                    tasks.append((corp, chunk, sector,
+                                  [(policy, firm.btax_params,
+                                    firm.asset.response,
+                                    firm.asset.adjustments['rescalar'])
+                                   for (policy, firm) in [('base', base),
+                                                          ('ref', ref)]]))
+            if executor is None:
+                paths = [BusinessModel.industry_capital_path(task)
+                         for task in tasks]
+            else:
+                paths = list(executor.map(BusinessModel.industry_capital_path,
+                                          tasks))
+        results = pd.concat(paths, ignore_index=True)
+        order = {ind: i for i, ind in enumerate(industries)}
+        results['order'] = results['industry'].map(order)
+        results.sort_values(['order', 'sector', 'policy', 'year'],
+                            kind='mergesort', inplace=True)
+        results.drop(['order'], axis=1, inplace=True)
+        results.reset_index(drop=True, inplace=True)
+        self.industry_capital_paths = results
+
+    @staticmethod
+    def industry_capital_path(task):
+        """
+        Calculates the capital paths for a list of industries, under the
+        baseline and the reform, for use in worker processes by
+        calc_industry_capital_paths. The reform Asset reuses the deductions of
+        the baseline Asset.
+        Parameters:
+            task: tuple of (corp, list of industries, sector label, list of
+                  (policy label, btax_params, investment response,
+                  rescaling factors for the sector) for the baseline and
+                  the reform)
+        Returns the tidy capital_path DataFrames, with sector and policy
+        columns added, for the baseline and the reform.
+        """
+        (corp, industries, sector, policies) = task
+        paths = list()
+        baseline = None
+        for (policy, btax_params, response, rescalar) in policies:
+            data = Data()
+            if corp:
+                data.update_rescaling(rescalar, data.rescale_noncorp)
+            else:
+                data.update_rescaling(data.rescale_corp, rescalar)
+            asset = Asset(btax_params, corp=corp, data=data,
+                          response=response, industry=list(industries),
+                          baseline=baseline)
+            asset.calc_all()
+            capital_path = asset.capital_path
+            capital_path.insert(1, 'sector', sector)
+            capital_path.insert(2, 'policy', policy)
+            paths.append(capital_path)
+            baseline = asset
+        return pd.concat(paths, ignore_index=True)
+
     def update_mtrlists(self):
         """
         Calls Investors to calculate MTRs on noncorporate business equity
@@ -1,7 +1,6 @@
-import copy
 import numpy as np
 import pandas as pd
-from biztax.years import START_YEAR, END_YEAR, NUM_YEARS
+from biztax.years import START_YEAR, END_YEAR, HISTORY_START
 from biztax.data import Data
 from biztax.asset import Asset
 from biztax.debt import Debt
@@ -15,18 +14,28 @@ class Corporation():
     Constructor for the Corporation class.
     This contains both the real and tax information relevant to the
     corporate income tax.
+
+    Parameters:
+        btax_params: DataFrame of business tax policy parameters
+        baseline: None, or the Corporation for the baseline policy, whose
+                  Asset deductions are reused by this Corporation's Asset
+                  for the vintages and years the policy does not change
     """
 
-    def __init__(self, btax_params):
+    def __init__(self, btax_params, baseline=None):
         # Store policy parameter objects
         if isinstance(btax_params, pd.DataFrame):
             self.btax_params = btax_params
         else:
             raise ValueError('btax_params must be DataFrame')
+        if baseline is not None and not isinstance(baseline, Corporation):
+            raise ValueError('baseline must be None or a Corporation')
         # Create Data object
         self.data = Data()
         # Create Asset object and calculate
-        self.asset = Asset(self.btax_params, corp=True, data=self.data)
+        self.asset = Asset(self.btax_params, corp=True, data=self.data,
+                           baseline=(None if baseline is None
+                                     else baseline.asset))
         self.asset.calc_all()
         # Create DomesticMNE object
         self.dmne = DomesticMNE(self.btax_params)
@@ -190,7 +199,8 @@ class Corporation():
         Updates the Asset object to include investment response.
         """
         # First, save the capital stock by asset type and year (for earnings)
-        self.old_capital_history = copy.deepcopy(self.asset.capital_history)
+        # calc_all builds a new capital_arr, so it need not be copied
+        self.old_capital_arr = self.asset.capital_arr
         self.asset.update_response(responses.investment_response)
         self.asset.calc_all()
 
@@ -210,18 +220,14 @@ class Corporation():
         new capital stock by asset type (based on the investment response),
         and the marginal product of capital.
         """
-        Kstock_base = copy.deepcopy(self.old_capital_history)
-        Kstock_ref = copy.deepcopy(self.asset.capital_history)
-        changeEarnings = np.zeros((95, NUM_YEARS))
-        for iyr in range(NUM_YEARS):  # for each year
-            ystr = str(iyr + START_YEAR)
-            mpk = np.array(responses.investment_response['MPKc' + ystr])
-            for i in range(95):  # by asset
-                changeEarnings[i, iyr] = (Kstock_ref[ystr][i] -
-                                          Kstock_base[ystr][i]) * mpk[i]
-        deltaE = np.zeros(NUM_YEARS)
-        for iyr in range(NUM_YEARS):
-            deltaE[iyr] = changeEarnings[:, iyr].sum()
+        window = slice(START_YEAR - HISTORY_START,
+                       END_YEAR - HISTORY_START + 1)
+        Kstock_base = self.old_capital_arr[:, window]
+        Kstock_ref = self.asset.capital_arr[:, window]
+        mpk = responses.investment_response[[
+            'MPKc' + str(year) for year in range(START_YEAR, END_YEAR + 1)]]
+        changeEarnings = (Kstock_ref - Kstock_base) * mpk.to_numpy()
+        deltaE = changeEarnings.sum(axis=0)
         # Update new earnings
         self.revenues['receipts'] = self.revenues['receipts'] + deltaE
 
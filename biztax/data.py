@@ -2,6 +2,11 @@
 Business-Taxation Data class.
 """
 import os
+import io
+import json
+import shutil
+import hashlib
+import tempfile
 import numpy as np
 import pandas as pd
 from taxcalc import read_egg_csv
@@ -16,96 +21,159 @@ class Data():
     central mechanism for updating and improving the underlying data. One of
     the important features of the Data object is that it should not be changed
     by any other objects in Business-Taxation.
+
+    Each dataset is read the first time it is used (or by Data.preload) and
+    is then kept in a snapshot shared by all Data objects in the process.
+    Each use of a dataset returns a copy of the snapshot, so that changing
+    it cannot affect any other Data object. Only the rescaling factors
+    (rescale_corp and rescale_noncorp) belong to each Data object, and
+    update_rescaling changes only that object.
     """
 
     CURRENT_PATH = os.path.abspath(os.path.dirname(__file__))
     CTAX_DATA_DIR = 'brc_data'
+    # Directory for the compiled CSV cache (None means no cache is used)
+    CACHE_DIR = os.environ.get('BIZTAX_CACHE_DIR')
 
-    def __init__(self):
-        self.gfactors = Data.read_csv('gfactors.csv')
-        self.historical_taxdata = Data.read_csv('historical_taxdata.csv')
-        self.historical_combined = Data.read_csv(
-            os.path.join(Data.CTAX_DATA_DIR, 'historical_combined.csv'))
+    # Datasets, by attribute name and CSV file
+    DATASETS = {
+        'gfactors': 'gfactors.csv',
+        'historical_taxdata': 'historical_taxdata.csv',
+        'historical_combined': os.path.join(CTAX_DATA_DIR,
+                                            'historical_combined.csv'),
         # Tax revenue data
-        self.taxrev_data = Data.read_csv(
-            os.path.join(Data.CTAX_DATA_DIR, 'taxrev.csv'))
+        'taxrev_data': os.path.join(CTAX_DATA_DIR, 'taxrev.csv'),
         # Corporate tax data for 2013
-        self.corp_tax2013 = Data.read_csv(
-            os.path.join(Data.CTAX_DATA_DIR, 'corp_taxreturn_2013.csv'))
+        'corp_tax2013': os.path.join(CTAX_DATA_DIR, 'corp_taxreturn_2013.csv'),
         # Data for FTC model
-        self.ftc_taxrates_data = Data.read_csv(
-            os.path.join(Data.CTAX_DATA_DIR, 'ftc_taxrates_data.csv'))
-        self.ftc_gdp_data = Data.read_csv(
-            os.path.join(Data.CTAX_DATA_DIR, 'ftc_gdp_data.csv'))
-        self.ftc_other_data = Data.read_csv(
-            os.path.join(Data.CTAX_DATA_DIR, 'ftc_other_data.csv'))
-        self.cfc_data = Data.read_csv(
-            os.path.join(Data.CTAX_DATA_DIR, 'cfc_data.csv'))
-        self.dmne_data = Data.read_csv(
-            os.path.join(Data.CTAX_DATA_DIR, 'dmne_data.csv'))
-        self.reprate_forecast = Data.read_csv(
-            os.path.join(Data.CTAX_DATA_DIR, 'repatriation_adjustment.csv'))
+        'ftc_taxrates_data': os.path.join(CTAX_DATA_DIR,
+                                          'ftc_taxrates_data.csv'),
+        'ftc_gdp_data': os.path.join(CTAX_DATA_DIR, 'ftc_gdp_data.csv'),
+        'ftc_other_data': os.path.join(CTAX_DATA_DIR, 'ftc_other_data.csv'),
+        'cfc_data': os.path.join(CTAX_DATA_DIR, 'cfc_data.csv'),
+        'dmne_data': os.path.join(CTAX_DATA_DIR, 'dmne_data.csv'),
+        'reprate_forecast': os.path.join(CTAX_DATA_DIR,
+                                         'repatriation_adjustment.csv'),
         # Data for Sec. 199
-        self.sec199_data = Data.read_csv(
-            os.path.join(Data.CTAX_DATA_DIR, 'sec199.csv'))
+        'sec199_data': os.path.join(CTAX_DATA_DIR, 'sec199.csv'),
         # Investment and capital data
-        self.investment_corp = Data.read_csv(
-            os.path.join(Data.CTAX_DATA_DIR, 'investment_corp.csv'))
-        self.investment_noncorp = Data.read_csv(
-            os.path.join(Data.CTAX_DATA_DIR, 'investment_ncorp.csv'))
-        self.capital_corp = Data.read_csv(
-            os.path.join(Data.CTAX_DATA_DIR, 'capital_corp.csv'))
-        self.capital_noncorp = Data.read_csv(
-            os.path.join(Data.CTAX_DATA_DIR, 'capital_ncorp.csv'))
-        self.investmentGfactors_data = Data.read_csv(
-            os.path.join(Data.CTAX_DATA_DIR, 'investment_gfactors.csv'))
+        'investment_corp': os.path.join(CTAX_DATA_DIR, 'investment_corp.csv'),
+        'investment_noncorp': os.path.join(CTAX_DATA_DIR,
+                                           'investment_ncorp.csv'),
+        'capital_corp': os.path.join(CTAX_DATA_DIR, 'capital_corp.csv'),
+        'capital_noncorp': os.path.join(CTAX_DATA_DIR, 'capital_ncorp.csv'),
+        'investmentGfactors_data': os.path.join(CTAX_DATA_DIR,
+                                                'investment_gfactors.csv'),
         # Tax depreciation information
-        self.depreciationIRS_data = Data.read_csv(
-            os.path.join(Data.CTAX_DATA_DIR, 'dep_data.csv'))
-        self.bonus_data = Data.read_csv(
-            os.path.join(Data.CTAX_DATA_DIR, 'bonus_data.csv'))
+        'depreciationIRS_data': os.path.join(CTAX_DATA_DIR, 'dep_data.csv'),
+        'bonus_data': os.path.join(CTAX_DATA_DIR, 'bonus_data.csv'),
         # Debt data
-        self.debt_data = Data.read_csv(
-            os.path.join(Data.CTAX_DATA_DIR, 'debt_history.csv'))
-        self.debt_forecast = Data.read_csv('debt_forecast.csv')
-        self.debt_data_corp = Data.read_csv(
-            os.path.join(Data.CTAX_DATA_DIR, 'corp_debt_data.csv'))
-        self.debt_data_noncorp = Data.read_csv(
-            os.path.join(Data.CTAX_DATA_DIR, 'noncorp_debt_data.csv'))
+        'debt_data': os.path.join(CTAX_DATA_DIR, 'debt_history.csv'),
+        'debt_forecast': 'debt_forecast.csv',
+        'debt_data_corp': os.path.join(CTAX_DATA_DIR, 'corp_debt_data.csv'),
+        'debt_data_noncorp': os.path.join(CTAX_DATA_DIR,
+                                          'noncorp_debt_data.csv'),
         # Pass-through IRS data
-        self.partner_data = Data.read_csv(
-            os.path.join(Data.CTAX_DATA_DIR, 'partnership_data.csv'))
-        self.Scorp_data = Data.read_csv(
-            os.path.join(Data.CTAX_DATA_DIR, 'scorp_data.csv'))
-        self.sp_data = Data.read_csv(
-            os.path.join(Data.CTAX_DATA_DIR, 'sp_nonfarm_data.csv'))
+        'partner_data': os.path.join(CTAX_DATA_DIR, 'partnership_data.csv'),
+        'Scorp_data': os.path.join(CTAX_DATA_DIR, 'scorp_data.csv'),
+        'sp_data': os.path.join(CTAX_DATA_DIR, 'sp_nonfarm_data.csv'),
         # Defaults for posssible use (may be deprecated)
-        self.econ_defaults = Data.read_csv(
-            os.path.join(Data.CURRENT_PATH, 'mini_params_econ.csv'))
+        'econ_defaults': 'mini_params_econ.csv'
+    }
+    # Scalar factors, by attribute name and (CSV file, column)
+    FACTORS = {
+        # Adjustment factors
+        'param_amt': ('adjfactors.csv', 'param_amt'),
+        'amt_frac': ('adjfactors.csv', 'amt_frac'),
+        'userate_pymtc': ('adjfactors.csv', 'userate_pymtc'),
+        'trans_amt0': ('adjfactors.csv', 'trans_amt0'),
+        'trans_amt1': ('adjfactors.csv', 'trans_amt1'),
+        'adjfactor_ftc_corp': ('adjfactors.csv', 'ftc'),
+        # Pass-through shares
+        'depshare_scorp_posinc': ('passthru_shares.csv', 'dep_scorp_pos'),
+        'depshare_scorp_neginc': ('passthru_shares.csv', 'dep_scorp_neg'),
+        'depshare_sp_posinc': ('passthru_shares.csv', 'dep_sp_pos'),
+        'depshare_sp_neginc': ('passthru_shares.csv', 'dep_sp_neg'),
+        'depshare_partner_posinc': ('passthru_shares.csv', 'dep_part_pos'),
+        'depshare_partner_neginc': ('passthru_shares.csv', 'dep_part_neg'),
+        'intshare_scorp_posinc': ('passthru_shares.csv', 'int_scorp_pos'),
+        'intshare_scorp_neginc': ('passthru_shares.csv', 'int_scorp_neg'),
+        'intshare_sp_posinc': ('passthru_shares.csv', 'int_sp_pos'),
+        'intshare_sp_neginc': ('passthru_shares.csv', 'int_sp_neg'),
+        'intshare_partner_posinc': ('passthru_shares.csv', 'int_part_pos'),
+        'intshare_partner_neginc': ('passthru_shares.csv', 'int_part_neg')
+    }
+
+    # Process-wide snapshot of the datasets read so far, shared by all
+    # Data objects
+    _snapshot = dict()
+
+    # functools caches of results built from the snapshot, cleared with it
+    _derived_caches = list()
+
+    def __init__(self):
+        # Rescaling factors are specific to each Data object
         self.rescale_corp = np.ones(NUM_YEARS)
         self.rescale_noncorp = np.ones(NUM_YEARS)
-        # Read in adjustment factors
-        adj_factors = Data.read_csv('adjfactors.csv')
-        self.param_amt = adj_factors['param_amt'].values[0]
-        self.amt_frac = adj_factors['amt_frac'].values[0]
-        self.userate_pymtc = adj_factors['userate_pymtc'].values[0]
-        self.trans_amt0 = adj_factors['trans_amt0'].values[0]
-        self.trans_amt1 = adj_factors['trans_amt1'].values[0]
-        self.adjfactor_ftc_corp = adj_factors['ftc'].values[0]
-        # Read in pass-through shares
-        passthru_factors = Data.read_csv('passthru_shares.csv')
-        self.depshare_scorp_posinc = passthru_factors['dep_scorp_pos'].values[0]
-        self.depshare_scorp_neginc = passthru_factors['dep_scorp_neg'].values[0]
-        self.depshare_sp_posinc = passthru_factors['dep_sp_pos'].values[0]
-        self.depshare_sp_neginc = passthru_factors['dep_sp_neg'].values[0]
-        self.depshare_partner_posinc = passthru_factors['dep_part_pos'].values[0]
-        self.depshare_partner_neginc = passthru_factors['dep_part_neg'].values[0]
-        self.intshare_scorp_posinc = passthru_factors['int_scorp_pos'].values[0]
-        self.intshare_scorp_neginc = passthru_factors['int_scorp_neg'].values[0]
-        self.intshare_sp_posinc = passthru_factors['int_sp_pos'].values[0]
-        self.intshare_sp_neginc = passthru_factors['int_sp_neg'].values[0]
-        self.intshare_partner_posinc = passthru_factors['int_part_pos'].values[0]
-        self.intshare_partner_neginc = passthru_factors['int_part_neg'].values[0]
+
+    def __getattr__(self, name):
+        """
+        Returns (a copy of) the dataset or factor called name, which is read
+        the first time any Data object uses it.
+        """
+        if name in Data.DATASETS:
+            return Data.load(name).copy()
+        if name in Data.FACTORS:
+            return Data.load(name)
+        raise AttributeError(
+            "'Data' object has no attribute '{}'".format(name))
+
+    @staticmethod
+    def load(name):
+        """
+        Returns the dataset or factor called name from the shared snapshot,
+        reading it (and all other factors in the same file) if necessary.
+        The result is shared by every Data object in the process, so it may
+        not be changed in place (Data attributes return copies).
+        """
+        if name not in Data._snapshot:
+            if name in Data.DATASETS:
+                Data._snapshot[name] = Data.read_csv(Data.DATASETS[name])
+            else:
+                filename = Data.FACTORS[name][0]
+                factors = Data.read_csv(filename)
+                for fname, (ffile, col) in Data.FACTORS.items():
+                    if ffile == filename:
+                        Data._snapshot[fname] = factors[col].values[0]
+        return Data._snapshot[name]
+
+    @staticmethod
+    def preload():
+        """
+        Reads all of the datasets and factors now, rather than when each is
+        first used.
+        """
+        for name in list(Data.DATASETS) + list(Data.FACTORS):
+            Data.load(name)
+
+    @staticmethod
+    def clear_snapshot():
+        """
+        Discards the shared datasets, so that they are read again when next
+        used (e.g. after editing files in brc_data), and the results cached
+        from them.
+        """
+        Data._snapshot = dict()
+        for cached in Data._derived_caches:
+            cached.cache_clear()
+
+    @staticmethod
+    def register_derived_cache(cached):
+        """
+        Registers a functools cache of results built from the shared
+        datasets, so that clear_snapshot also clears it.
+        """
+        Data._derived_caches.append(cached)
 
     @staticmethod
     def read_csv(filename):
@@ -116,50 +184,147 @@ class Data():
         assert filename.endswith('.csv')
         fname = os.path.join(Data.CURRENT_PATH, filename)
         if os.path.exists(fname):
-            dframe = pd.read_csv(fname)
+            if Data.CACHE_DIR is None:
+                dframe = pd.read_csv(fname)
+            else:
+                dframe = Data.read_cached_csv(fname)
         else:  # find file in conda package
             dframe = read_egg_csv(filename)  # pragma: no cover
         return dframe
 
+    @staticmethod
+    def read_cached_csv(fname):
+        """
+        Returns Pandas DataFrame object containing data in the CSV file fname
+        (an absolute path), using the compiled cache in Data.CACHE_DIR.
+        Cache entries are keyed by the path, contents and modification time
+        of the CSV file, so a changed file is parsed again and its entry is
+        rebuilt automatically (replacing any out-of-date entry).
+        """
+        with open(fname, 'rb') as csvfile:
+            contents = csvfile.read()
+        stem = '{}-{}'.format(
+            os.path.splitext(os.path.basename(fname))[0],
+            hashlib.sha1(fname.encode()).hexdigest()[:8])
+        key = hashlib.sha1(contents)
+        key.update(str(os.stat(fname).st_mtime_ns).encode())
+        entry = os.path.join(Data.CACHE_DIR,
+                             '{}-{}'.format(stem, key.hexdigest()[:16]))
+        if os.path.isdir(entry):
+            try:
+                return Data.read_cache_entry(entry)
+            except (OSError, ValueError):
+                shutil.rmtree(entry, ignore_errors=True)
+        dframe = pd.read_csv(io.BytesIO(contents))
+        try:
+            os.makedirs(Data.CACHE_DIR, exist_ok=True)
+            for oldentry in os.listdir(Data.CACHE_DIR):
+                if oldentry.startswith(stem + '-'):
+                    shutil.rmtree(os.path.join(Data.CACHE_DIR, oldentry),
+                                  ignore_errors=True)
+            Data.write_cache_entry(dframe, entry)
+        except OSError:
+            # An unwritable cache only means parsing the CSV next time
+            pass
+        return dframe
+
+    @staticmethod
+    def write_cache_entry(dframe, entry):
+        """
+        Writes dframe to the cache entry directory, with one .npy array
+        (columns x rows) for each column dtype and a JSON list of columns.
+        """
+        tmpdir = tempfile.mkdtemp(dir=os.path.dirname(entry))
+        columns = []
+        groups = dict()
+        for col in dframe.columns:
+            dtype = str(dframe[col].dtype)
+            groups.setdefault(dtype, []).append(dframe[col].to_numpy())
+            columns.append([col, dtype, len(groups[dtype]) - 1])
+        for dtype, arrays in groups.items():
+            np.save(os.path.join(tmpdir, dtype + '.npy'),
+                    np.array(arrays, dtype=dtype).reshape(len(arrays),
+                                                          len(dframe)),
+                    allow_pickle=(dtype == 'object'))
+        with open(os.path.join(tmpdir, 'columns.json'), 'w') as jfile:
+            json.dump(columns, jfile)
+        try:
+            os.rename(tmpdir, entry)
+        except OSError:
+            # Another process wrote the same entry first
+            shutil.rmtree(tmpdir, ignore_errors=True)
+
+    @staticmethod
+    def read_cache_entry(entry):
+        """
+        Returns Pandas DataFrame object stored in the cache entry directory.
+        The arrays are read in binary form, which avoids parsing the CSV
+        text and inferring its dtypes; the DataFrame holds its own copy of
+        the data.
+        """
+        with open(os.path.join(entry, 'columns.json')) as jfile:
+            columns = json.load(jfile)
+        arrays = dict()
+        for dtype in set(dtype for _, dtype, _ in columns):
+            if dtype == 'object':
+                arrays[dtype] = np.load(os.path.join(entry, 'object.npy'),
+                                        allow_pickle=True)
+            else:
+                arrays[dtype] = np.load(os.path.join(entry, dtype + '.npy'))
+        return pd.DataFrame({col: arrays[dtype][i]
+                             for col, dtype, i in columns},
+                            columns=[col for col, _, _ in columns])
+
     @staticmethod
     def econ_depr_df():
         """
-        Retrieves the DataFrame with economic depreciation rates
-        """
-        df_econdepr1 = Data.read_csv(
-            os.path.join(Data.CTAX_DATA_DIR,
-                         'economic_depreciation_rates.csv'))
-        # Extract each column as an array
-        asset = np.asarray(df_econdepr1['Asset'])
-        code = np.asarray(df_econdepr1['Code'])
-        delta = np.asarray(df_econdepr1['Economic Depreciation Rate'])
-        # Append values for residential categories
-        asset = np.append(asset, ['Residential new',
-                                  'Residential additions and alterations',
-                                  'Residential major improvements',
-                                  'Residential equipment'])
-        code = np.append(code, ['RR10', 'RR20', 'RR30', 'RR40'])
-        delta = np.append(delta, [delta[96], delta[96], delta[96], delta[36]])
-        df_econdepr2 = pd.DataFrame({'Asset': asset, 'Code': code,
-                                     'delta': delta})
-        # Drop nonbusiness categories, land and inventories
-        df_econdepr2.drop([28, 36, 56, 89, 90, 96, 97, 98],
-                          axis=0, inplace=True)
-        df_econdepr2.reset_index(drop=True, inplace=True)
-        return df_econdepr2
+        Retrieves the DataFrame with economic depreciation rates.
+        It is built once per process; each call returns a copy.
+        """
+        if 'econ_depr_df' not in Data._snapshot:
+            df_econdepr1 = Data.read_csv(
+                os.path.join(Data.CTAX_DATA_DIR,
+                             'economic_depreciation_rates.csv'))
+            # Extract each column as an array
+            asset = np.asarray(df_econdepr1['Asset'])
+            code = np.asarray(df_econdepr1['Code'])
+            delta = np.asarray(df_econdepr1['Economic Depreciation Rate'])
+            # Append values for residential categories
+            asset = np.append(asset, ['Residential new',
+                                      'Residential additions and alterations',
+                                      'Residential major improvements',
+                                      'Residential equipment'])
+            code = np.append(code, ['RR10', 'RR20', 'RR30', 'RR40'])
+            delta = np.append(delta, [delta[96], delta[96],
+                                      delta[96], delta[36]])
+            df_econdepr2 = pd.DataFrame({'Asset': asset, 'Code': code,
+                                         'delta': delta})
+            # Drop nonbusiness categories, land and inventories
+            df_econdepr2.drop([28, 36, 56, 89, 90, 96, 97, 98],
+                              axis=0, inplace=True)
+            df_econdepr2.reset_index(drop=True, inplace=True)
+            Data._snapshot['econ_depr_df'] = df_econdepr2
+        return Data._snapshot['econ_depr_df'].copy()
 
     def taxdep_info_gross(self, extension):
         """
         Retrieves the basic DataFrame with tax depreciation information.
+        It is built once per process for each extension (depr_file); each
+        call returns a copy.
         """
-        filename = 'tax_depreciation_' + extension + '.csv'
-        taxdep1 = Data.read_csv(
-            os.path.join(Data.CURRENT_PATH, filename))
-        taxdep1.rename(columns={'GDS life': 'L_gds', 'ADS life': 'L_ads',
-                                'Asset Type': 'Asset', 'GDS method': 'Method',
-                                'Asset code': 'Code'},
-                       inplace=True)
-        return taxdep1.merge(right=self.econ_depr_df(), how='outer', on='Code')
+        key = ('taxdep_info_gross', extension)
+        if key not in Data._snapshot:
+            filename = 'tax_depreciation_' + extension + '.csv'
+            taxdep1 = Data.read_csv(
+                os.path.join(Data.CURRENT_PATH, filename))
+            taxdep1.rename(columns={'GDS life': 'L_gds', 'ADS life': 'L_ads',
+                                    'Asset Type': 'Asset',
+                                    'GDS method': 'Method',
+                                    'Asset code': 'Code'},
+                           inplace=True)
+            Data._snapshot[key] = taxdep1.merge(right=self.econ_depr_df(),
+                                                how='outer', on='Code')
+        return Data._snapshot[key].copy()
 
     def update_rescaling(self, corparray, ncorparray):
         """
@@ -1,4 +1,3 @@
-import copy
 import numpy as np
 import pandas as pd
 from biztax.years import START_YEAR, END_YEAR, NUM_YEARS, HISTORY_START
@@ -24,8 +23,17 @@ class Debt():
         corp: True for corporate, False for noncorporate
         btax_params: DataFrame of business tax policy parameters
         asset_forecast: list of nonfinancial asset amounts
-        response: array of percent changes in optimal debt-asset ratios
-        eta: debt retirement rate
+        response: array of percent changes in optimal debt-asset ratios,
+                  or a 2-D array (scenario x year) of them
+        eta: debt retirement rate (at least 0 and less than 1), or a 1-D
+             array of them
+    With an array of eta values or of responses, the Debt object evaluates
+    every scenario at once, from one asset forecast and debt history. The
+    histories then have a leading scenario axis and interest_path stacks
+    the paths for each scenario. An array of eta values together with a
+    2-D response pairs them row by row (eta[i] with response[i]), so they
+    must have the same number of scenarios; for every combination of the
+    two, repeat the eta values and the response rows.
     """
 
     def __init__(self, btax_params, asset_forecast,
@@ -47,7 +55,8 @@ class Debt():
         if response is None:
             self.response = np.zeros(NUM_YEARS)
         else:
-            if len(response) == NUM_YEARS:
+            if (np.ndim(response) in (1, 2)
+                    and np.shape(response)[-1] == NUM_YEARS):
                 self.response = response
             else:
                 raise ValueError('Wrong response')
@@ -61,10 +70,20 @@ class Debt():
             self.asset_forecast = asset_forecast
         else:
             raise ValueError('Wrong length for asset forecast')
-        if eta >= 0 and eta <= 1:
+        if (np.ndim(eta) <= 1 and np.size(eta) > 0
+                and np.all((np.asarray(eta) >= 0) & (np.asarray(eta) < 1))):
             self.eta = eta
         else:
             raise ValueError('Value of eta inappropriate')
+        if (np.ndim(self.eta) == 1 and np.ndim(self.response) == 2
+                and np.size(self.eta) != np.shape(self.response)[0]):
+            raise ValueError('eta and response must have the same number '
+                             'of scenarios')
+        # Shape of the scenario axis (empty for a single scenario)
+        self.batch_shape = np.broadcast_shapes(np.shape(self.eta),
+                                               np.shape(self.response)[:-1])
+        # Fraction of debt not retired each year, broadcast across years
+        self.keep = np.asarray(1. - np.asarray(self.eta))[..., np.newaxis]
 
     def get_haircuts(self):
         if self.corp:
@@ -102,9 +121,13 @@ class Debt():
         # Extend for 2015-2027
         At.extend(At[START_YEAR-HISTORY_START] * self.asset_forecast[1:] / self.asset_forecast[0])
         An.extend(An[START_YEAR-HISTORY_START] * self.asset_forecast[1:] / self.asset_forecast[0])
-        L.extend(L[54] * self.asset_forecast[1:] / self.asset_forecast[0]
-                 * self.delta[1:] / self.delta[0])
-        D = [L[i] - At[i] - An[i] for i in range(len(L))]
+        L_ext = (L[54] * self.asset_forecast[1:] / self.asset_forecast[0]
+                 * self.delta[..., 1:] / self.delta[..., :1])
+        L = np.concatenate([np.broadcast_to(L, L_ext.shape[:-1] + (len(L),)),
+                            L_ext], axis=-1)
+        At = np.array(At)
+        An = np.array(An)
+        D = L - At - An
         i_t.extend(self.data.debt_forecast['i_t'][1:])
         i_pr.extend([i_pr[START_YEAR-HISTORY_START]] * (NUM_YEARS-1))
         # Save level histories
@@ -112,57 +135,88 @@ class Debt():
         self.debt_asset_history = At
         self.muni_asset_history = An
         self.debt_liab_history = L
-        self.i_a = i_t
-        self.i_l = [i_t[i] + i_pr[i] for i in range(len(i_t))]
-        assert len(self.i_l) == len(self.net_debt_history)
+        self.i_a = np.array(i_t)
+        self.i_l = self.i_a + np.array(i_pr)
+        assert len(self.i_l) == L.shape[-1]
         assert len(self.i_l) == len(self.i_a)
 
     def build_flow_history(self):
         """
         Constructs originations.
         """
-        O = np.zeros(END_YEAR - HISTORY_START + 1)
-        for i in range(1, END_YEAR - HISTORY_START + 1):
-            O[i] = (self.debt_liab_history[i] -
-                    self.debt_liab_history[i-1] * (1 - self.eta))
+        L = self.debt_liab_history
+        O = np.zeros(self.batch_shape + (END_YEAR - HISTORY_START + 1,))
+        O[..., 1:] = L[..., 1:] - L[..., :-1] * self.keep
         self.originations = O
 
     def constrain_history(self):
         """
         Recalculates level and flow histories subject to the constraint that
         originations must be nonnegative.
+        With the constraint, liabilities follow
+            L[i] = max(L_opt[i], L[i-1] * (1 - eta)),
+        which is evaluated in closed form as the maximum over origination
+        years k <= i of L_opt[k] * (1 - eta)^(i - k), for every scenario at
+        once. The years in which the constraint binds are recorded in
+        binding_years, a boolean [scenario x] year array.
 
         Note: This is not binding in general, only in the cases of either
               large changes to the optimal debt-to-asset ratio or for very low
               values of eta.
         """
-        if min(self.originations) < 0.:
-            At = copy.deepcopy(self.debt_asset_history)
-            An = copy.deepcopy(self.muni_asset_history)
-            L_opt = copy.deepcopy(self.debt_liab_history)
-            L = np.zeros(END_YEAR - HISTORY_START + 1)
-            L[0] = L_opt[0]
-            O = np.zeros(END_YEAR - HISTORY_START + 1)
-            for i in range(1, END_YEAR - HISTORY_START + 1):
-                O[i] = max(L_opt[i] - L[i-1] * (1 - self.eta), 0.)
-                L[i] = L[i-1] * (1 - self.eta) + O[i]
-            self.debt_liab_history = L
-            self.originations = O
-            self.net_debt_history = L - At - An
+        constrained = (np.asarray(self.originations) < 0.).any(axis=-1)
+        self.binding_years = np.zeros(np.shape(self.originations), bool)
+        if constrained.any():
+            At = self.debt_asset_history
+            An = self.muni_asset_history
+            L_opt = np.broadcast_to(self.debt_liab_history,
+                                    np.shape(self.originations))
+            i = np.arange(END_YEAR - HISTORY_START + 1).reshape(-1, 1)
+            k = np.arange(END_YEAR - HISTORY_START + 1)
+            lower = (k <= i)
+            keep = np.broadcast_to(self.keep, self.batch_shape + (1,))
+            decay = keep[..., np.newaxis] ** np.where(lower, i - k, 0)
+            L = np.where(lower, decay * L_opt[..., np.newaxis, :],
+                         -np.inf).max(axis=-1)
+            O = np.zeros(np.shape(self.originations))
+            O[..., 1:] = L_opt[..., 1:] - L[..., :-1] * keep
+            binding = (O < 0.)
+            O = np.maximum(O, 0.)
+            # Only replace the scenarios with negative originations
+            constrained = constrained[..., np.newaxis]
+            self.binding_years = binding & constrained
+            self.debt_liab_history = np.where(constrained, L, L_opt)
+            self.originations = np.where(constrained, O, self.originations)
+            self.net_debt_history = self.debt_liab_history - At - An
 
-    def calc_real_interest(self):
+    def calc_real_interest(self, recursive=True):
         """
         Calculates interest income and interest paid.
+        Interest paid in year i is the sum over origination years j <= i of
+            originations[j] * (1 - eta)^(i - j) * i_l[j]
+        By default this is carried forward one year at a time,
+            int_expense[i] = int_expense[i-1] * (1 - eta)
+                             + originations[i] * i_l[i],
+        and recursive=False evaluates the sum directly.
         """
         self.int_income = (np.array(self.debt_asset_history)
                            * np.array(self.i_a))
         self.muni_income = (np.array(self.muni_asset_history)
                             * np.array(self.i_a))
-        int_expense = np.zeros(END_YEAR - HISTORY_START + 1)
-        for i in range(1, END_YEAR - HISTORY_START + 1):
-            for j in range(i+1):
-                int_expense[i] += (self.originations[j] *
-                                   (1 - self.eta)**(i - j) * self.i_l[j])
+        int_expense = np.zeros(self.batch_shape
+                               + (END_YEAR - HISTORY_START + 1,))
+        keep = self.keep[..., 0]
+        if recursive:
+            int_paid = self.originations * np.array(self.i_l)
+            stock = int_paid[..., 0]
+            for i in range(1, END_YEAR - HISTORY_START + 1):
+                stock = stock * keep + int_paid[..., i]
+                int_expense[..., i] = stock
+        else:
+            for i in range(1, END_YEAR - HISTORY_START + 1):
+                for j in range(i+1):
+                    int_expense[..., i] += (self.originations[..., j] *
+                                            keep**(i - j) * self.i_l[j])
         self.int_expense = int_expense
 
     def calc_tax_interest(self):
@@ -170,25 +224,50 @@ class Debt():
         Calculates taxable interest income, deductible interest and the
         net interest deduction based on tax law.
         """
-        int_expded = np.zeros(END_YEAR - HISTORY_START + 1)
+        self.int_expded = self.tax_interest(self.haircuts)
+
+    def tax_interest(self, haircuts):
+        """
+        Calculates deductible interest for every year, as a masked
+        (year x origination year) matrix product with the interest paid on
+        each year's originations.
+        Parameters:
+            haircuts: dict of haircut arrays by year (as from get_haircuts),
+                      which may have a leading axis over policy scenarios
+                      (broadcast against the Debt's own scenario axis)
+        Returns an array of deductible interest, [scenario x] year
+        """
+        nhist = START_YEAR - HISTORY_START
+        i = np.arange(END_YEAR - HISTORY_START + 1).reshape(-1, 1)
+        j = np.arange(END_YEAR - HISTORY_START + 1)
+        lower = (j <= i)
+        int_paid = np.asarray(self.originations) * np.asarray(self.i_l)
+        keep = self.keep[..., np.newaxis]
         # Calculations for years before the budget window
-        for i in range(1, 54):
-            for j in range(i+1):
-                int_expded[i] += (self.originations[j] *
-                                  (1 - self.eta)**(i - j - 1) * self.i_l[j])
+        decay_pre = np.where(lower, keep ** np.where(lower, i - j - 1, 0), 0.)
         # Calculations during the budget window
-        for i in range(START_YEAR-HISTORY_START, END_YEAR - HISTORY_START + 1):
-            for j in range(i+1):
-                hctouse = 0.0
-                if j + HISTORY_START < self.haircuts['id_hc_oldyear'][i-(START_YEAR-HISTORY_START)]:
-                    # If originated before "old" haircut, apply haircut
-                    hctouse = self.haircuts['id_hc_old'][i-54]
-                if j + HISTORY_START >= self.haircuts['id_hc_newyear'][i-(START_YEAR-HISTORY_START)]:
-                    # If originated after "new" haircut, apply haircut
-                    hctouse = max(hctouse, self.haircuts['id_hc_new'][i-(START_YEAR-HISTORY_START)])
-                int_expded[i] += (self.originations[j] * (1 - self.eta)**(i-j)
-                                  * self.i_l[j] * (1 - hctouse))
-        self.int_expded = int_expded
+        decay = np.where(lower, keep ** np.maximum(i - j, 0), 0.)[..., nhist:, :]
+        hc_oldyear = np.asarray(haircuts['id_hc_oldyear'],
+                                dtype=float)[..., :NUM_YEARS, np.newaxis]
+        hc_old = np.asarray(haircuts['id_hc_old'],
+                            dtype=float)[..., :NUM_YEARS, np.newaxis]
+        hc_newyear = np.asarray(haircuts['id_hc_newyear'],
+                                dtype=float)[..., :NUM_YEARS, np.newaxis]
+        hc_new = np.asarray(haircuts['id_hc_new'],
+                            dtype=float)[..., :NUM_YEARS, np.newaxis]
+        # If originated before "old" haircut, apply haircut
+        hctouse = np.where(j + HISTORY_START < hc_oldyear, hc_old, 0.)
+        # If originated after "new" haircut, apply haircut
+        hctouse = np.where(j + HISTORY_START >= hc_newyear,
+                           np.maximum(hctouse, hc_new), hctouse)
+        int_window = np.einsum('...ij,...j->...i', decay * (1 - hctouse),
+                               int_paid)
+        int_expded = np.zeros(int_window.shape[:-1]
+                              + (END_YEAR - HISTORY_START + 1,))
+        int_expded[..., 1:nhist] = np.einsum(
+            '...ij,...j->...i', decay_pre[..., 1:nhist, :], int_paid)
+        int_expded[..., nhist:] = int_window
+        return int_expded
 
     def build_interest_path(self):
         """
@@ -199,15 +278,31 @@ class Debt():
 
         WARNING: May need to include rescale_corp and rescale_noncorp
         """
-        debt = np.array(self.net_debt_history[START_YEAR-HISTORY_START:])
-        nip = np.array(self.int_expense[START_YEAR-HISTORY_START:]
-                       - self.int_income[START_YEAR-HISTORY_START:] - self.muni_income[START_YEAR-HISTORY_START:])
-        nid = np.array(self.int_expded[START_YEAR-HISTORY_START:]
-                       - self.int_income[START_YEAR-HISTORY_START:])
-        NID_results = pd.DataFrame({'year': range(START_YEAR, END_YEAR + 1),
-                                    'nid': nid,
-                                    'nip': nip,
-                                    'debt': debt})
+        nhist = START_YEAR - HISTORY_START
+        debt = np.broadcast_to(self.net_debt_history[..., nhist:],
+                               self.batch_shape + (NUM_YEARS,))
+        nip = np.broadcast_to(self.int_expense[..., nhist:]
+                              - self.int_income[nhist:]
+                              - self.muni_income[nhist:],
+                              self.batch_shape + (NUM_YEARS,))
+        nid = np.broadcast_to(self.int_expded[..., nhist:]
+                              - self.int_income[nhist:],
+                              self.batch_shape + (NUM_YEARS,))
+        nscen = int(np.prod(self.batch_shape))
+        NID_results = pd.DataFrame({'year': np.tile(np.arange(START_YEAR,
+                                                              END_YEAR + 1),
+                                                    nscen),
+                                    'nid': nid.ravel(),
+                                    'nip': nip.ravel(),
+                                    'debt': debt.ravel()})
+        if self.batch_shape:
+            # Stack the paths for each scenario, labeled by scenario and eta
+            scenario = np.repeat(np.arange(nscen), NUM_YEARS)
+            eta = np.broadcast_to(np.asarray(self.eta, dtype=float),
+                                  self.batch_shape)
+            eta = np.repeat(eta.ravel(), NUM_YEARS)
+            NID_results.insert(0, 'eta', eta)
+            NID_results.insert(0, 'scenario', scenario)
         self.interest_path = NID_results
 
     def calc_all(self):
@@ -226,48 +321,52 @@ class Debt():
     def get_nid(self):
         """
         Returns the net interest deductions for [START_YEAR, END_YEAR]
+        (scenario x year when evaluating several scenarios)
         """
-        nid = np.array(self.interest_path['nid'])
+        nid = np.array(self.interest_path['nid']).reshape(
+            self.batch_shape + (NUM_YEARS,))
         return nid
 
     def get_intDed(self):
         """
         Returns deductible interest expense.
         """
-        int1 = self.int_expded[START_YEAR-HISTORY_START:]
+        int1 = self.int_expded[..., START_YEAR-HISTORY_START:]
         return int1
 
     def get_intInc(self):
         """
         Returns interest income (excluding on muni bonds).
         """
-        int1 = self.int_income[START_YEAR-HISTORY_START:]
+        int1 = self.int_income[..., START_YEAR-HISTORY_START:]
         return int1
 
     def get_muniInc(self):
         """
         Returns interest income from municipal bonds.
         """
-        int1 = self.muni_income[START_YEAR-HISTORY_START:]
+        int1 = self.muni_income[..., START_YEAR-HISTORY_START:]
         return int1
 
     def get_intPaid(self):
         """
         Returns interest paid.
         """
-        int1 = self.int_expense[START_YEAR-HISTORY_START:]
+        int1 = self.int_expense[..., START_YEAR-HISTORY_START:]
         return int1
 
     def get_nip(self):
         """
         Returns the net interest paid for [START_YEAR, END_YEAR]
         """
-        nip = np.array(self.interest_path['nip'])
+        nip = np.array(self.interest_path['nip']).reshape(
+            self.batch_shape + (NUM_YEARS,))
         return nip
 
     def get_debt(self):
         """
         Returns the net debtfor [START_YEAR, END_YEAR]
         """
-        debt = np.array(self.interest_path['debt'])
+        debt = np.array(self.interest_path['debt']).reshape(
+            self.batch_shape + (NUM_YEARS,))
         return debt
@@ -85,8 +85,8 @@ class Investor():
         m = 0.44
         # Nominal expected return to equity
         iyr = year - START_YEAR
-        E = (Data().econ_defaults['r_e_c'][iyr]
-             + Data().econ_defaults['pi'][iyr])
+        econ_defaults = Data().econ_defaults
+        E = econ_defaults['r_e_c'][iyr] + econ_defaults['pi'][iyr]
         # shares of cg in short-term, long-term, and held until death
         omega_scg = 0.034
         omega_lcg = 0.496
@@ -0,0 +1,41 @@
+"""
+Business-Taxation helpers for running calculations in parallel.
+"""
+import os
+import contextlib
+import concurrent.futures
+from biztax.data import Data
+
+
+def get_executor(executor, max_workers=None):
+    """
+    Returns a context manager giving the concurrent.futures executor to
+    use for a calculation.
+        executor: None to run serially, 'thread' or 'process' for a new
+                  pool (shut down on exit), or an Executor from the
+                  caller (left running on exit)
+        max_workers: number of workers for a new pool
+    Worker processes read the Data snapshot once, when they start.
+    """
+    if (executor is None
+            or isinstance(executor, concurrent.futures.Executor)):
+        return contextlib.nullcontext(executor)
+    if executor == 'thread':
+        return concurrent.futures.ThreadPoolExecutor(max_workers)
+    if executor == 'process':
+        return concurrent.futures.ProcessPoolExecutor(
+            max_workers, initializer=Data.preload)
+    raise ValueError('executor must be None, thread, process '
+                     'or an Executor')
+
+
+def num_tasks(max_workers=None):
+    """
+    Returns the number of tasks to split a calculation into, one for each
+    worker: max_workers, or the number of processors if it is None.
+    """
+    if max_workers is None:
+        return os.cpu_count() or 1
+    if max_workers < 1:
+        raise ValueError('max_workers must be at least 1')
+    return max_workers
@@ -1,10 +1,9 @@
 """
 Business-Taxation PassThrough class.
 """
-import copy
 import numpy as np
 import pandas as pd
-from biztax.years import START_YEAR, END_YEAR, NUM_YEARS
+from biztax.years import START_YEAR, END_YEAR, HISTORY_START
 from biztax.data import Data
 from biztax.asset import Asset
 from biztax.debt import Debt
@@ -37,18 +36,28 @@ class PassThrough():
         create_earnings()
         create_debt()
         real_activity()
+
+    Parameters:
+        btax_params: DataFrame of business tax policy parameters
+        baseline: None, or the PassThrough for the baseline policy, whose
+                  Asset deductions are reused by this PassThrough's Asset
+                  for the vintages and years the policy does not change
     """
 
-    def __init__(self, btax_params):
+    def __init__(self, btax_params, baseline=None):
         # Store policy parameter objects
         if isinstance(btax_params, pd.DataFrame):
             self.btax_params = btax_params
         else:
             raise ValueError('btax_params must be DataFrame')
+        if baseline is not None and not isinstance(baseline, PassThrough):
+            raise ValueError('baseline must be None or a PassThrough')
         # Create Data object
         self.data = Data()
         # Create Asset object and calculate
-        self.asset = Asset(self.btax_params, corp=False, data=self.data)
+        self.asset = Asset(self.btax_params, corp=False, data=self.data,
+                           baseline=(None if baseline is None
+                                     else baseline.asset))
         self.asset.calc_all()
         # Create earnings forecast
         self.create_earnings()
@@ -251,7 +260,8 @@ class PassThrough():
         Updates the Asset object to include investment response.
         """
         # First, save the capital stock by asset type and year (for earnings)
-        self.old_capital_history = copy.deepcopy(self.asset.capital_history)
+        # calc_all builds a new capital_arr, so it need not be copied
+        self.old_capital_arr = self.asset.capital_arr
         self.asset.update_response(responses.investment_response)
         self.asset.calc_all()
 
@@ -261,18 +271,14 @@ class PassThrough():
         new capital stock by asset type (based on the investment response),
         and the marginal product of capital.
         """
-        Kstock_base = copy.deepcopy(self.old_capital_history)
-        Kstock_ref = copy.deepcopy(self.asset.capital_history)
-        changeEarnings = np.zeros((95, NUM_YEARS))
-        for j in range(NUM_YEARS):  # for each year
-            ystr = str(j + START_YEAR)
-            mpk = np.array(responses.investment_response['MPKnc' + ystr])
-            for i in range(95):  # by asset
-                changeEarnings[i, j] = (Kstock_ref[ystr][i]
-                                        - Kstock_base[ystr][i]) * mpk[i]
-        deltaE = np.zeros(NUM_YEARS)
-        for j in range(NUM_YEARS):  # for each year
-            deltaE[j] = changeEarnings[:, j].sum()
+        window = slice(START_YEAR - HISTORY_START,
+                       END_YEAR - HISTORY_START + 1)
+        Kstock_base = self.old_capital_arr[:, window]
+        Kstock_ref = self.asset.capital_arr[:, window]
+        mpk = responses.investment_response[[
+            'MPKnc' + str(year) for year in range(START_YEAR, END_YEAR + 1)]]
+        changeEarnings = (Kstock_ref - Kstock_base) * mpk.to_numpy()
+        deltaE = changeEarnings.sum(axis=0)
         earnings_old = np.array(self.earnings['total'])
         ebitda_chgfactor = ((earnings_old + deltaE)
                             * self.data.rescale_noncorp
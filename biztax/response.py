@@ -1,12 +1,17 @@
 """
 Business-Taxation Response class.
 """
+import os
 import copy
+import hashlib
+import tempfile
+import collections
 import numpy as np
 import pandas as pd
 from biztax.years import START_YEAR, END_YEAR, NUM_YEARS
 from biztax.data import Data
 from biztax.btaxmini import BtaxMini
+from biztax.parallel import get_executor
 
 
 class Response():
@@ -20,7 +25,16 @@ class Response():
         legal response: to tax differential across business forms
 
     Parameters:
-        none
+        executor: None to calculate the baseline and reform costs of
+                  capital serially, or 'thread', 'process' or a
+                  concurrent.futures Executor to calculate the reform years
+                  in parallel (and alongside the baseline)
+        max_workers: number of workers (None for the number of processors)
+
+    The calculations are in two steps: calc_inputs computes everything that
+    does not depend on the elasticities (costs of capital and EATRs, tax
+    shields and penalties), and calc_responses applies the elasticities
+    to them, so several sets of elasticities can share one calc_inputs.
 
     Associated objects (results):
         investment_response: DataFrame of investment responses and MPKs
@@ -28,8 +42,28 @@ class Response():
         repatriation_response: DataFrame of repatriation responses
         rescale_corp & rescale_noncorp: rescaling measures from legal response
 
+    The baseline user costs and EATRs for the investment response are
+    cached by the contents of the policy parameters and the data they
+    depend on and by BTAXMINI_VERSION, in memory (the MAX_CACHED most
+    recently used) and, if CACHE_DIR is set, on disk.
+
     WARNING: The legal response method is not in use!
     """
+    # Directory for the baseline cost-of-capital cache on disk (None means
+    # results are only cached in memory)
+    CACHE_DIR = os.environ.get('BIZTAX_CACHE_DIR')
+
+    # Baseline BtaxMini results by cache key, shared by all Response objects,
+    # least recently used first
+    _btaxmini_cache = collections.OrderedDict()
+
+    # Number of baseline BtaxMini results kept in memory
+    MAX_CACHED = 4
+
+    # Version of the BtaxMini calculations in the cache key: increase it
+    # whenever a change to BtaxMini changes its results, so that results
+    # cached on disk by older code are not used
+    BTAXMINI_VERSION = 1
 
     DEFAULT_ELASTICITIES = {
         'inv_usercost_c': 0.0,
@@ -46,9 +80,13 @@ class Response():
         'first_year_response': 2017
     }
 
-    def __init__(self):
+    def __init__(self, executor=None, max_workers=None):
         # Specify default elasticity values
-        self.elasticities = Response.DEFAULT_ELASTICITIES
+        self.elasticities = dict(Response.DEFAULT_ELASTICITIES)
+        self.executor = executor
+        self.max_workers = max_workers
+        # Elasticity-independent inputs (from calc_inputs)
+        self.inputs = None
         # Set response results to None
         self.investment_response = None
         self.debt_response = None
@@ -97,15 +135,150 @@ class Response():
         """
         Executes all response calculations
         """
-        self._calc_investment_response(btax_params_base, btax_params_ref)
-        self._calc_debt_responses(btax_params_base, btax_params_ref)
-        self._calc_repatriation_response(btax_params_base, btax_params_ref)
-        self._calc_shifting_response(btax_params_base, btax_params_ref)
-        self._calc_legal_response(btax_params_base, btax_params_ref)
+        self.calc_inputs(btax_params_base, btax_params_ref)
+        self.calc_responses()
+
+    def calc_inputs(self, btax_params_base, btax_params_ref, firstyear=None):
+        """
+        Calculates the parts of the responses that do not depend on the
+        elasticities, and saves them in the inputs dictionary.
+            firstyear: first year for which to calculate the costs of capital
+                       and EATRs (first_year_response if None); responses
+                       may then use any first_year_response from firstyear
+        """
+        if firstyear is None:
+            firstyear = self.elasticities['first_year_response']
+        self.inputs = dict()
+        self._calc_investment_inputs(btax_params_base, btax_params_ref,
+                                     firstyear)
+        self._calc_debt_inputs(btax_params_base, btax_params_ref)
+        self._calc_repatriation_inputs(btax_params_base, btax_params_ref)
+        self._calc_shifting_inputs(btax_params_base, btax_params_ref)
+
+    def calc_responses(self):
+        """
+        Calculates all responses by applying the elasticities to the inputs
+        from calc_inputs.
+        """
+        assert self.inputs is not None
+        self._calc_investment_response()
+        self._calc_debt_responses()
+        self._calc_repatriation_response()
+        self._calc_shifting_response()
+        self._calc_legal_response()
+
+    @staticmethod
+    def btaxmini_key(btax_params, years):
+        """
+        Returns the cache key for the BtaxMini results for btax_params in
+        years: a hash of BTAXMINI_VERSION, the relevant policy parameters,
+        the data BtaxMini uses (economic defaults, economic and tax
+        depreciation information and historical bonus rates) and the years.
+        """
+        data = Data()
+        key = hashlib.sha1()
+        key.update('version {}'.format(Response.BTAXMINI_VERSION).encode())
+        params = btax_params[BtaxMini.PARAM_COLUMNS]
+        key.update(pd.util.hash_pandas_object(params, index=False).values)
+        depr_files = sorted(set(btax_params['depr_file']) | {'pre2017'})
+        frames = ([data.econ_defaults, data.bonus_data] +
+                  [data.taxdep_info_gross(depr_file)
+                   for depr_file in depr_files])
+        for frame in frames:
+            key.update(pd.util.hash_pandas_object(frame, index=False).values)
+        key.update(str(list(years)).encode())
+        return key.hexdigest()
+
+    @staticmethod
+    def baseline_btaxmini_results(btax_params, years):
+        """
+        Returns BtaxMini.calc_results for btax_params in years, calculated
+        only if the same parameters have not been run before, in this
+        process or (if CACHE_DIR is set) in any other.
+        The result is shared, so it is read-only.
+        """
+        key = Response.btaxmini_key(btax_params, years)
+        if key in Response._btaxmini_cache:
+            Response._btaxmini_cache.move_to_end(key)
+            return Response._btaxmini_cache[key]
+        results = None
+        if Response.CACHE_DIR is not None:
+            fname = os.path.join(Response.CACHE_DIR,
+                                 'btaxmini-{}.npy'.format(key))
+            if os.path.exists(fname):
+                try:
+                    results = np.load(fname)
+                except (OSError, ValueError):
+                    results = None
+        if results is None:
+            results = BtaxMini(btax_params).calc_results(years)
+            if Response.CACHE_DIR is not None:
+                try:
+                    os.makedirs(Response.CACHE_DIR, exist_ok=True)
+                    (fd, tmpname) = tempfile.mkstemp(
+                        dir=Response.CACHE_DIR, suffix='.npy')
+                    try:
+                        with os.fdopen(fd, 'wb') as tmpfile:
+                            np.save(tmpfile, results)
+                        os.replace(tmpname, fname)
+                    except OSError:
+                        os.remove(tmpname)
+                        raise
+                except OSError:
+                    # An unwritable cache only means recalculating next time
+                    pass
+        results.setflags(write=False)
+        Response._btaxmini_cache[key] = results
+        while len(Response._btaxmini_cache) > Response.MAX_CACHED:
+            Response._btaxmini_cache.popitem(last=False)
+        return results
+
+    @staticmethod
+    def clear_btaxmini_cache():
+        """
+        Discards the baseline BtaxMini results cached in memory.
+        """
+        Response._btaxmini_cache = collections.OrderedDict()
 
     # ----- begin private methods of Release class -----
 
-    def _calc_investment_response(self, btax_params_base, btax_params_ref):
+    def _calc_investment_inputs(self, btax_params_base, btax_params_ref,
+                                firstyear):
+        """
+        Calculates the percent changes in user cost of capital, changes in
+        EATR and the marginal products of capital, for each asset type, for
+        each year from firstyear, corporate and noncorporate.
+        """
+        years = range(firstyear, END_YEAR + 1)
+        btaxmini_ref = BtaxMini(btax_params_ref)
+        with get_executor(self.executor, self.max_workers) as executor:
+            # Start the reform years in parallel, if using an executor
+            if executor is not None:
+                futures_ref = btaxmini_ref.submit_results(
+                    executor, years, self.max_workers)
+            # Calculate (or reuse) cost of capital and EATR for every year
+            # for baseline
+            results_base = Response.baseline_btaxmini_results(
+                btax_params_base, years)
+            # Calculate cost of capital and EATR for every year for reform
+            if executor is None:
+                results_ref = btaxmini_ref.calc_results(years)
+            else:
+                results_ref = np.concatenate(
+                    [future.result() for future in futures_ref], axis=1)
+        (u_c_base, u_nc_base, eatr_c_base, eatr_nc_base) = np.moveaxis(
+            results_base, -1, 0)
+        (u_c_ref, u_nc_ref, eatr_c_ref, eatr_nc_ref) = np.moveaxis(
+            results_ref, -1, 0)
+        self.inputs['inv_firstyear'] = firstyear
+        self.inputs['usercost_pctch_c'] = u_c_ref / u_c_base - 1
+        self.inputs['usercost_pctch_nc'] = u_nc_ref / u_nc_base - 1
+        self.inputs['eatr_ch_c'] = eatr_c_ref - eatr_c_base
+        self.inputs['eatr_ch_nc'] = eatr_nc_ref - eatr_nc_base
+        self.inputs['MPKc'] = (u_c_ref + u_c_base) / 2.0
+        self.inputs['MPKnc'] = (u_nc_ref + u_nc_base) / 2.0
+
+    def _calc_investment_response(self):
         """
         Calculates percent change in investment & marginal product of capital,
         for each asset type, for each year, corporate and noncorporate.
@@ -122,92 +295,112 @@ class Response():
         selast_nc = self.elasticities['inv_eatr_nc']
         mne_share_c = self.elasticities['mne_share_c']
         mne_share_nc = self.elasticities['mne_share_nc']
+        # Costs of capital and EATRs must be available from firstyear
+        inv_firstyear = self.inputs['inv_firstyear']
+        assert firstyear >= inv_firstyear
+        # Compare results to produce the responses
+        deltaIc = (self.inputs['usercost_pctch_c'] * elast_c +
+                   self.inputs['eatr_ch_c'] * selast_c * mne_share_c)
+        deltaInc = (self.inputs['usercost_pctch_nc'] * elast_nc +
+                    self.inputs['eatr_ch_nc'] * selast_nc * mne_share_nc)
+        MPKc = self.inputs['MPKc']
+        MPKnc = self.inputs['MPKnc']
+        responses = dict()
         # No responses for years before first_year_response
         for year in range(START_YEAR, firstyear):
             ystr = str(year)
-            maindata['deltaIc' + ystr] = 0.
-            maindata['deltaInc' + ystr] = 0.
-            maindata['MPKc' + ystr] = 0.
-            maindata['MPKnc' + ystr] = 0.
-        # Calculate cost of capital and EATR for every year for baseline
-        btaxmini_base = BtaxMini(btax_params_base)
-        years = range(firstyear, END_YEAR + 1)
-        results_base = btaxmini_base.run_btax_mini(years)
-        # Calculate cost of capital and EATR for every year for reform
-        btaxmini_ref = BtaxMini(btax_params_ref)
-        results_ref = btaxmini_ref.run_btax_mini(years)
-        # Compare results to produce the responses
-        for year in years:
+            responses['deltaIc' + ystr] = 0.
+            responses['deltaInc' + ystr] = 0.
+            responses['MPKc' + ystr] = 0.
+            responses['MPKnc' + ystr] = 0.
+        for year in range(firstyear, END_YEAR + 1):
             ystr = str(year)
-            maindata['deltaIc' + ystr] = (((results_ref['u_c' + ystr]
-                                            / results_base['u_c' + ystr] - 1)
-                                           * elast_c +
-                                           (results_ref['eatr_c' + ystr]
-                                            - results_base['eatr_c' + ystr])
-                                           * selast_c * mne_share_c))
-            maindata['deltaInc' + ystr] = (((results_ref['u_nc' + ystr]
-                                             / results_base['u_nc' + ystr] - 1)
-                                            * elast_nc +
-                                            (results_ref['eatr_nc' + ystr]
-                                             - results_base['eatr_nc' + ystr])
-                                            * selast_nc * mne_share_nc))
-            maindata['MPKc' + ystr] = (results_ref['u_c' + ystr]
-                                       + results_base['u_c' + ystr]) / 2.0
-            maindata['MPKnc' + ystr] = (results_ref['u_nc' + ystr]
-                                        + results_base['u_nc' + ystr]) / 2.0
+            iyr = year - inv_firstyear
+            responses['deltaIc' + ystr] = deltaIc[:, iyr]
+            responses['deltaInc' + ystr] = deltaInc[:, iyr]
+            responses['MPKc' + ystr] = MPKc[:, iyr]
+            responses['MPKnc' + ystr] = MPKnc[:, iyr]
+        maindata = pd.concat([maindata, pd.DataFrame(responses,
+                                                     index=maindata.index)],
+                             axis=1)
         # Save the responses
         self.investment_response = copy.deepcopy(maindata)
 
-    def _calc_debt_response_corp(self, btax_params_base, btax_params_ref):
+    def _calc_debt_inputs(self, btax_params_base, btax_params_ref):
         """
-        Calculates corporate debt response.
+        Calculates the percent changes in the tax shields from debt,
+        corporate and noncorporate.
         """
         # Extract the information on haircuts
         years = np.array(range(START_YEAR, END_YEAR + 1))
         fracded_base = np.array(btax_params_base['fracded_c'])
         fracded_ref = np.array(btax_params_ref['fracded_c'])
+        taxshield_base = btax_params_base['tau_c']* fracded_base
+        taxshield_ref = np.asarray(btax_params_ref['tau_c']) * fracded_ref
+        self.inputs['taxshield_pctch_c'] = np.asarray(
+            taxshield_ref / taxshield_base - 1.)
+        # Extract information on haircuts
+        id_hc_years = np.array(btax_params_ref['newIntPaid_noncorp_hcyear'])
+        id_hc_new = np.array(btax_params_ref['newIntPaid_noncorp_hc'])
+        hclist = np.where(id_hc_years >= years, id_hc_new, 0.0)
+        taxshield_base = btax_params_base['tau_nc']
+        taxshield_ref = btax_params_ref['tau_nc'] * (1 - hclist)
+        self.inputs['taxshield_pctch_nc'] = np.asarray(
+            taxshield_ref / taxshield_base - 1)
+
+    def _calc_debt_response_corp(self):
+        """
+        Calculates corporate debt response.
+        """
+        years = np.array(range(START_YEAR, END_YEAR + 1))
         elast_debt_list = np.where(
             years >= self.elasticities['first_year_response'],
             self.elasticities['debt_taxshield_c'], 0.0
         )
-        taxshield_base = btax_params_base['tau_c']* fracded_base
-        taxshield_ref = np.asarray(btax_params_ref['tau_c']) * fracded_ref
-        pctch_delta = elast_debt_list * (taxshield_ref / taxshield_base - 1.)
+        pctch_delta = elast_debt_list * self.inputs['taxshield_pctch_c']
         return pctch_delta
 
-    def _calc_debt_response_noncorp(self, btax_params_base, btax_params_ref):
+    def _calc_debt_response_noncorp(self):
         """
         Calculates noncorporate debt response
         """
-        # Extract information on haircuts
-        id_hc_years = np.array(btax_params_ref['newIntPaid_noncorp_hcyear'])
-        id_hc_new = np.array(btax_params_ref['newIntPaid_noncorp_hc'])
         years = np.array(range(START_YEAR, END_YEAR + 1))
-        hclist = np.where(id_hc_years >= years, id_hc_new, 0.0)
         elast_debt_list = np.where(
             years >= self.elasticities['first_year_response'],
             self.elasticities['debt_taxshield_nc'], 0.0
         )
-        taxshield_base = btax_params_base['tau_nc']
-        taxshield_ref = btax_params_ref['tau_nc'] * (1 - hclist)
-        pctch_delta = (taxshield_ref / taxshield_base - 1) * elast_debt_list
+        pctch_delta = self.inputs['taxshield_pctch_nc'] * elast_debt_list
         return pctch_delta
 
-    def _calc_debt_responses(self, btax_params_base, btax_params_ref):
+    def _calc_debt_responses(self):
         """
         Calls the functions to calculate debt responses and saves them in
         a DataFrame.
         """
-        debtresp_c = self._calc_debt_response_corp(btax_params_base,
-                                                   btax_params_ref)
-        debtresp_nc = self._calc_debt_response_noncorp(btax_params_base,
-                                                       btax_params_ref)
+        debtresp_c = self._calc_debt_response_corp()
+        debtresp_nc = self._calc_debt_response_noncorp()
         debtresp_df = pd.DataFrame({'year': range(START_YEAR, END_YEAR + 1),
                                     'pchDelta_corp': debtresp_c,
                                     'pchDelta_noncorp': debtresp_nc})
         self.debt_response = debtresp_df
 
-    def _calc_repatriation_response(self, btax_params_base, btax_params_ref):
+    def _calc_repatriation_inputs(self, btax_params_base, btax_params_ref):
+        """
+        Calculates the change in the tax penalty from repatriating.
+        """
+        # Get foreign tax rate
+        ftax = Data().cfc_data.loc[0, 'taxrt']
+        # Get domestic tax rate
+        dtax_base = np.asarray(btax_params_base['tau_c'])
+        dtax_ref = np.asarray(btax_params_ref['tau_c'])
+        # Get foreign dividend inclusion rate for CFCs
+        divrt_base = np.asarray(btax_params_base['foreign_dividend_inclusion'])
+        divrt_ref = np.asarray(btax_params_ref['foreign_dividend_inclusion'])
+        penalty_base = np.maximum(dtax_base - ftax, 0.) * divrt_base
+        penalty_ref = np.maximum(dtax_ref - ftax, 0.) * divrt_ref
+        self.inputs['penalty_ch'] = penalty_ref - penalty_base
+
+    def _calc_repatriation_response(self):
         """
         Calculates the change in the repatriation rate of current CFC
         after-tax profits. The parameter used is the semi-elasticity of repatriations
@@ -221,18 +414,8 @@ class Response():
         semi-elasticity is -10.66536949, which is consistent with the
         repatriation rate as of 2014.
         """
-        # Get foreign tax rate
-        ftax = Data().cfc_data.loc[0, 'taxrt']
-        # Get domestic tax rate
-        dtax_base = np.asarray(btax_params_base['tau_c'])
-        dtax_ref = np.asarray(btax_params_ref['tau_c'])
-        # Get foreign dividend inclusion rate for CFCs
-        divrt_base = np.asarray(btax_params_base['foreign_dividend_inclusion'])
-        divrt_ref = np.asarray(btax_params_ref['foreign_dividend_inclusion'])
-        penalty_base = np.maximum(dtax_base - ftax, 0.) * divrt_base
-        penalty_ref = np.maximum(dtax_ref - ftax, 0.) * divrt_ref
         # Compute change in repatriation rate
-        reprate_ch1 = (penalty_ref - penalty_base) * self.elasticities['reprate_inc']
+        reprate_ch1 = self.inputs['penalty_ch'] * self.elasticities['reprate_inc']
         reprate_ch = np.zeros(NUM_YEARS)
         for i in range(NUM_YEARS):
             if i + 2014 >= self.elasticities['first_year_response']:
@@ -242,24 +425,10 @@ class Response():
                                        'reprate_a': np.zeros(NUM_YEARS)})
         self.repatriation_response = repat_response
     
-    def _calc_shifting_response(self, btax_params_base, btax_params_ref):
+    def _calc_shifting_inputs(self, btax_params_base, btax_params_ref):
         """
-        Calculates the profit-shifting response, the percent change
-        in earnings booked in CFCs. When implemented in the DomesticMNE
-        class and the CFC class, the reallocation of booked profits
-        is between CFCs and foreign branches. Any increase in profits
-        booked in CFCs is constrained to not exceed foreign branch income.
-        This is implemented as a semi-elasticity w.r.t. the tax shield
-        from booking abroad. Under pre-TCJA law, the shield from booking
-        in the CFC is the difference between the domestic and foreign tax
-        rates, adjusted for the repatriation rate. Under the TCJA, this
-        must also account for GILTI. The formula should account for the
-        share of income (at the margin) included in US taxable income
-        (max(cfc_inclusion, GILTI_inclusion)). This should also account
-        for the fraction of foreign taxes paid eligible for the foreign
-        tax credit (80% under GILTI).
-        Items needed:
-            Repatriation rate: repate_e
+        Calculates the change in the tax shield from shifting profits to
+        CFCs (see _calc_shifting_response).
         """
         # Fraction of marginal CFC income shielded from US tax
         shieldshr_base = ((1. -
@@ -280,8 +449,29 @@ class Response():
         # Compute tax shields from shifting profits at margin
         shield_base = shieldshr_base * shieldrt_base
         shield_ref = shieldshr_ref * shieldrt_ref
+        self.inputs['shield_ch'] = shield_ref - shield_base
+
+    def _calc_shifting_response(self):
+        """
+        Calculates the profit-shifting response, the percent change
+        in earnings booked in CFCs. When implemented in the DomesticMNE
+        class and the CFC class, the reallocation of booked profits
+        is between CFCs and foreign branches. Any increase in profits
+        booked in CFCs is constrained to not exceed foreign branch income.
+        This is implemented as a semi-elasticity w.r.t. the tax shield
+        from booking abroad. Under pre-TCJA law, the shield from booking
+        in the CFC is the difference between the domestic and foreign tax
+        rates, adjusted for the repatriation rate. Under the TCJA, this
+        must also account for GILTI. The formula should account for the
+        share of income (at the margin) included in US taxable income
+        (max(cfc_inclusion, GILTI_inclusion)). This should also account
+        for the fraction of foreign taxes paid eligible for the foreign
+        tax credit (80% under GILTI).
+        Items needed:
+            Repatriation rate: repate_e
+        """
         # Compute change in profit shifting
-        shift_ch1 = (shield_ref - shield_base) * self.elasticities['shifting']
+        shift_ch1 = self.inputs['shield_ch'] * self.elasticities['shifting']
         # Adjust for first year to apply it
         shift_ch2 = np.zeros(NUM_YEARS)
         for i in range(NUM_YEARS):
@@ -291,7 +481,7 @@ class Response():
         shift_ch3 = np.maximum(np.minimum(shift_ch2, 1.0), -1.0)
         self.shifting_response = shift_ch3
 
-    def _calc_legal_response(self, btax_params_base, btax_params_ref):
+    def _calc_legal_response(self):
         """
         Reallocation of business activity between corporate and noncorporate
         sections, achieved by modifying the rescaling factors. For now,
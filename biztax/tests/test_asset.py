@@ -1,9 +1,11 @@
 """
 Test Asset class.
 """
+import numpy as np
 import pandas as pd
 import pytest
-from biztax import Asset, Response
+from biztax import Asset, Data, Response
+from biztax.years import START_YEAR, HISTORY_START, END_YEAR
 
 
 @pytest.mark.parametrize('reform_number, corporate',
@@ -48,3 +50,208 @@ def test_update_response(clp_params_df):
     response_df = pd.DataFrame()
     asset.update_response(response_df)
     assert isinstance(asset.response, pd.DataFrame)
+
+
+def test_unit_depreciation_recovers_basis(clp_params_df):
+    """
+    Test that calcUnitDep recovers the full basis of declining balance
+    assets with integer tax lives that are fully depreciated within the
+    history.
+    """
+    asset = Asset(clp_params_df)
+    asset.build_deprLaw_matrices()
+    years = list(range(HISTORY_START, END_YEAR + 1))
+    unitdep = asset.calcUnitDep(years)
+    assert unitdep.shape == (95, len(years), len(years))
+    iyr = 1990 - HISTORY_START
+    method = np.asarray(asset.method_history[iyr])
+    life = asset.life_history[:, iyr]
+    dbal = (np.isin(method, ['DB 200%', 'DB 150%'])
+            & (life == np.round(life)) & (life <= 25))
+    assert dbal.any()
+    assert np.allclose(unitdep[dbal, iyr, :].sum(axis=1), 1.0)
+    # No deductions taken before the year investment made
+    assert np.allclose(unitdep[:, iyr, :iyr], 0.)
+
+
+def test_dbsl_schedule_cache(clp_params_df):
+    """
+    Test that DB/SL schedules are shared across Asset objects and match
+    the deductions from calcUnitDep.
+    """
+    Asset.dbsl_schedule.cache_clear()
+    asset1 = Asset(clp_params_df)
+    asset1.build_deprLaw_matrices()
+    unitdep = asset1.calcUnitDep([END_YEAR])[:, :, 0]
+    misses = Asset.dbsl_schedule.cache_info().misses
+    assert misses > 0
+    asset2 = Asset(clp_params_df)
+    asset2.build_deprLaw_matrices()
+    asset2.calcUnitDep([END_YEAR])
+    assert Asset.dbsl_schedule.cache_info().misses == misses
+    sched = Asset.dbsl_schedule('DB 200%', 5., 0.)
+    assert not sched.flags.writeable
+    iyr = END_YEAR - 3 - HISTORY_START
+    method = np.asarray(asset1.method_history[iyr])
+    i = list(method).index('DB 200%')
+    bonus = min(asset1.bonus_history[i, iyr] * asset1.adjustments['bonus']
+                + asset1.adjustments['sec179'], 1.0)
+    expect = Asset.dbsl_schedule('DB 200%', asset1.life_history[i, iyr],
+                                 bonus)[3]
+    assert np.isclose(unitdep[i, iyr], expect)
+
+
+def test_deprlaw_arrays(clp_params_df):
+    """
+    Test the depreciation law arrays built from the policy parameters.
+    """
+    params = clp_params_df.copy()
+    params.loc[5:, 'depr_5yr_method'] = 'Expensing'
+    asset = Asset(params)
+    asset.build_deprLaw_matrices()
+    nvint = END_YEAR - HISTORY_START + 1
+    assert asset.life_history.shape == (95, nvint)
+    assert asset.bonus_history.shape == (95, nvint)
+    assert len(asset.method_history) == nvint
+    assert asset.method_codes.dtype == np.int8
+    assert asset.method_codes.shape == (95, nvint)
+    iyr = START_YEAR + 5 - HISTORY_START
+    method = np.asarray(asset.method_history[iyr])
+    assert (Asset.method_code(method) == asset.method_codes[:, iyr]).all()
+    expensed = (method == 'Expensing')
+    assert expensed.sum() > 2
+    assert (np.asarray(asset.method_history[iyr - 1])[expensed]
+            != 'Expensing').any()
+    # Assets with the same depreciation laws share the arrays
+    asset2 = Asset(params)
+    asset2.build_deprLaw_matrices()
+    assert asset2.life_history is asset.life_history
+    assert not asset.life_history.flags.writeable
+    # Clearing the Data snapshot rebuilds them from the data
+    Data.clear_snapshot()
+    assert Asset.deprLaw_arrays.cache_info().currsize == 0
+    asset3 = Asset(params)
+    asset3.build_deprLaw_matrices()
+    assert asset3.life_history is not asset.life_history
+    assert np.array_equal(asset3.life_history, asset.life_history)
+    # Invalid depreciation systems are rejected
+    params.loc[3, 'depr_7yr_method'] = 'DB 200%'
+    with pytest.raises(ValueError):
+        Asset(params).build_deprLaw_matrices()
+
+
+def test_depreciation_all_years(reforms):
+    """
+    Test that depreciation for all years at once is consistent with the
+    budget window results and applies the undepreciated basis haircut.
+    """
+    params = reforms[2]['params_df']
+    asset = Asset(params)
+    asset.calc_all()
+    allyears = asset.calcDep_allyears()
+    budget = asset.calcDep_budget()
+    assert len(allyears) == END_YEAR - HISTORY_START + 1
+    assert np.allclose(allyears[START_YEAR - HISTORY_START:], budget)
+    assert np.allclose(budget * asset.adjustments['rescalar'],
+                       asset.get_taxdep())
+    [depded, otherded] = asset.calcDep_years([2017, 2018])
+    assert np.allclose(asset.calcDep_oneyear(2018), [depded[1], otherded[1]])
+    # Removing the haircut raises deductions from its first year only
+    params = params.copy()
+    params['undepBasis_corp_hc'] = 0.
+    asset2 = Asset(params)
+    asset2.calc_all()
+    budget2 = asset2.calcDep_budget()
+    assert np.allclose(budget2[:2018 - START_YEAR],
+                       budget[:2018 - START_YEAR])
+    assert (budget2[2018 - START_YEAR:] > budget[2018 - START_YEAR:]).all()
+
+
+@pytest.mark.parametrize('reform_number', [1, 2])
+def test_incremental_from_baseline(reform_number, reforms, clp_params_df):
+    """
+    Test that an Asset reusing a baseline Asset gives the same results as
+    a full calculation.
+    """
+    base = Asset(clp_params_df)
+    base.calc_all()
+    params = reforms[reform_number]['params_df']
+    full = Asset(params)
+    full.calc_all()
+    incr = Asset(params, baseline=base)
+    incr.calc_all()
+    assert np.allclose(incr.deduction_history, full.deduction_history)
+    assert np.allclose(incr.capital_path, full.capital_path)
+    # Baseline must match business type
+    with pytest.raises(ValueError):
+        Asset(params, corp=False, baseline=base)
+
+
+def test_history_arrays_and_views(clp_params_df):
+    """
+    Test the capital and investment history arrays and their DataFrame views.
+    """
+    asset = Asset(clp_params_df)
+    asset.calc_all()
+    assert asset.investment_arr.shape == (95, len(asset.investment_years))
+    assert asset.capital_arr.shape == (95, len(asset.capital_years))
+    assert asset.trueDep_arr.shape == (95, len(asset.trueDep_years))
+    inv_df = asset.investment_history
+    assert inv_df is asset.investment_history
+    assert (inv_df['asset_code'] == asset.asset_codes).all()
+    assert np.allclose(inv_df[str(END_YEAR)], asset.investment_arr[:, -1])
+    capital_df = asset.capital_history
+    assert np.allclose(capital_df[str(START_YEAR + 1)],
+                       capital_df[str(START_YEAR)]
+                       - asset.trueDep[str(START_YEAR)]
+                       + inv_df[str(START_YEAR)], rtol=0.05)
+    # Views are rebuilt after recalculation
+    asset.calc_all()
+    assert asset.investment_history is not inv_df
+
+
+def test_accumulate_capital():
+    """
+    Test the closed-form capital accumulation against the recursion, with
+    and without a batch axis.
+    """
+    rng = np.random.RandomState(1)
+    delta = np.array([0.02, 0.15, 0.55])
+    capital0 = rng.uniform(1., 10., (2, 3))
+    investment = rng.uniform(0., 2., (2, 3, 5))
+    pce = np.cumprod(rng.uniform(1.0, 1.05, 6))
+    (capital, truedep) = Asset.accumulate_capital(capital0, investment,
+                                                  delta, pce)
+    assert capital.shape == (2, 3, 6)
+    assert truedep.shape == (2, 3, 5)
+    expect = np.zeros((2, 3, 6))
+    expect[:, :, 0] = capital0
+    for t in range(5):
+        expect[:, :, t+1] = ((expect[:, :, t] - delta * expect[:, :, t]
+                              + investment[:, :, t]) * pce[t+1] / pce[t])
+    assert np.allclose(capital, expect)
+    assert np.allclose(truedep, expect[:, :, :5] * delta[:, np.newaxis])
+    (capital1, _) = Asset.accumulate_capital(capital0[1], investment[1],
+                                             delta, pce)
+    assert np.allclose(capital1, capital[1])
+
+
+def test_multiple_industries(clp_params_df):
+    """
+    Test that a batch of industries gives the same capital paths as
+    separate Assets for each industry.
+    """
+    industries = ['FARM', 'INFO', 'ALL']
+    multi = Asset(clp_params_df, corp=False, industry=industries)
+    multi.calc_all()
+    assert multi.capital_arr.shape[:2] == (3, 95)
+    path = multi.capital_path
+    assert list(path['industry'].unique()) == industries
+    for ind in industries:
+        single = Asset(clp_params_df, corp=False, industry=ind)
+        single.calc_all()
+        path1 = path[path['industry'] == ind].drop(['industry'], axis=1)
+        assert np.allclose(path1, single.capital_path)
+    assert len(Asset(clp_params_df, industry='all').industries) == 25
+    with pytest.raises(ValueError):
+        Asset(clp_params_df, industry=[1, 2])
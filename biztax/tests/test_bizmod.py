@@ -3,9 +3,12 @@ Test BusinessModel class.
 """
 import os
 import filecmp
+import concurrent.futures
+import numpy as np
 import pytest
 import taxcalc as itax
-from biztax import Policy, BusinessModel, Response
+from biztax import Policy, BusinessModel, Response, Asset
+from biztax.years import NUM_YEARS
 
 
 def test_incorrect_calc_all():
@@ -113,3 +116,101 @@ def test_reforms(reform_number, reforms, puf_subsample, actual_vs_expect):
     results = bizmod.corp_ref.taxreturn.combined_return.round(dec)
     fname = 'bizmod_corp_ref{}_expect.csv'.format(reform_number)
     actual_vs_expect(results, fname, precision=dec)
+
+
+def test_industry_capital_paths():
+    """
+    Test the industry capital paths, serially and with an executor.
+    """
+    bizmod = BusinessModel(Policy(), itax.Policy(),
+                           investor_data='nodata.csv',
+                           industries=['FARM', 'INFO', 'ALL'])
+    bizmod.calc_industry_capital_paths()
+    serial = bizmod.industry_capital_paths
+    assert len(serial) == 3 * 2 * 2 * NUM_YEARS
+    assert list(serial['industry'].unique()) == ['FARM', 'INFO', 'ALL']
+    # Baseline and reform agree without a reform
+    base = serial[serial['policy'] == 'base'].reset_index(drop=True)
+    ref = serial[serial['policy'] == 'ref'].reset_index(drop=True)
+    assert np.allclose(base['taxDep'], ref['taxDep'])
+    # Industry totals match the aggregate Asset
+    total = serial[(serial['industry'] == 'ALL')
+                   & (serial['sector'] == 'corp')
+                   & (serial['policy'] == 'base')]
+    assert np.allclose(total['Kstock'], bizmod.corp_base.asset.get_forecast())
+    for executor in ['thread', 'process']:
+        bizmod.executor = executor
+        bizmod.calc_industry_capital_paths()
+        assert bizmod.industry_capital_paths.equals(serial)
+    # More workers than sectors splits the industries into chunks
+    bizmod.max_workers = 6
+    with concurrent.futures.ProcessPoolExecutor(6) as executor:
+        bizmod.executor = executor
+        bizmod.calc_industry_capital_paths()
+    assert bizmod.industry_capital_paths.equals(serial)
+    with pytest.raises(ValueError):
+        BusinessModel(Policy(), itax.Policy(), investor_data='nodata.csv',
+                      industries='FARM')
+
+
+@pytest.mark.requires_pufcsv
+def test_elasticity_sweep(reforms, puf_subsample):
+    """
+    Test that calc_elasticity_sweep gives the same results as calc_all
+    with a Response for each set of elasticities.
+    """
+    elasticities_list = [
+        {'inv_usercost_c': -1.0, 'debt_taxshield_c': 0.4},
+        {'inv_eatr_c': -0.3, 'mne_share_c': 0.5, 'reprate_inc': -10.0,
+         'first_year_response': 2019}
+    ]
+    bizmod = BusinessModel(reforms[1]['policy_obj'], itax.Policy(),
+                           investor_data=puf_subsample)
+    results = bizmod.calc_elasticity_sweep(elasticities_list)
+    assert len(results) == len(elasticities_list) * NUM_YEARS
+    assert list(results.columns[:2]) == ['scenario', 'year']
+    for scenario, elasticities in enumerate(elasticities_list):
+        response = Response()
+        response.update_elasticities(elasticities)
+        bizmod = BusinessModel(reforms[1]['policy_obj'], itax.Policy(),
+                               investor_data=puf_subsample)
+        bizmod.calc_all(response=response)
+        actual = results[results['scenario'] == scenario]
+        assert np.allclose(actual['AllTax_change'],
+                           bizmod.model_results['AllTax_change'])
+        assert np.all(actual['inv_usercost_c'] ==
+                      response.elasticities['inv_usercost_c'])
+    with pytest.raises(ValueError):
+        bizmod.calc_elasticity_sweep({'inv_usercost_c': -1.0})
+
+
+def test_reform_reuses_baseline(reforms, monkeypatch):
+    """
+    Test that the reform Assets in a BusinessModel reuse the baseline
+    deductions, recalculating only the changed vintages, and give the same
+    results as calculating everything.
+    """
+    calls = list()
+    calcDep_vintages = Asset.calcDep_vintages
+
+    def spy(asset, years, first=0):
+        calls.append((asset.baseline is not None, len(years), first))
+        return calcDep_vintages(asset, years, first)
+
+    monkeypatch.setattr(Asset, 'calcDep_vintages', spy)
+    bizmod = BusinessModel(reforms[1]['policy_obj'], itax.Policy(),
+                           investor_data='nodata.csv')
+    assert bizmod.corp_ref.asset.baseline is bizmod.corp_base.asset
+    assert bizmod.passthru_ref.asset.baseline is bizmod.passthru_base.asset
+    incremental = [call for call in calls if call[0]]
+    assert len(incremental) > 0
+    assert all(first > 0 or nyears < NUM_YEARS
+               for (_, nyears, first) in incremental)
+    for (sector, corp) in [(bizmod.corp_ref, True),
+                           (bizmod.passthru_ref, False)]:
+        full = Asset(bizmod.btax_params_ref, corp=corp)
+        full.calc_all()
+        assert np.allclose(sector.asset.deduction_history,
+                           full.deduction_history, rtol=1e-12, atol=0.0)
+        assert np.allclose(sector.asset.capital_path['taxDep'],
+                           full.capital_path['taxDep'], rtol=1e-12)
@@ -1,9 +1,12 @@
 """
 Test BtaxMini class.
 """
+import concurrent.futures
+import numpy as np
 import pandas as pd
 import pytest
-from biztax import BtaxMini
+from biztax import BtaxMini, Asset, Data
+from biztax.years import HISTORY_START
 
 
 def test_run_btax_mini(clp_params_df):
@@ -15,3 +18,161 @@ def test_run_btax_mini(clp_params_df):
     year_list = [2017]
     res = btaxmini.run_btax_mini(year_list)
     assert isinstance(res, pd.DataFrame)
+
+
+def test_run_btax_mini_years(clp_params_df):
+    """
+    Test the year-batched results against the single-year calculations,
+    and the wide and tidy DataFrame exports.
+    """
+    btaxmini = BtaxMini(clp_params_df)
+    year_list = [2017, 2020, 2029]
+    results = btaxmini.calc_results(year_list)
+    assert results.shape == (95, 3, len(BtaxMini.MEASURES))
+    for iyr, year in enumerate(year_list):
+        oneyear = btaxmini.calc_oneyear(year)
+        for k, col in enumerate(['uc_c', 'uc_nc', 'eatr_c', 'eatr_nc']):
+            assert np.allclose(results[:, iyr, k], oneyear[col], rtol=1e-12)
+    wide = btaxmini.run_btax_mini(year_list)
+    assert wide.columns.is_unique
+    assert np.allclose(wide['eatr_nc2020'], results[:, 1, 3], rtol=1e-12)
+    tidy = btaxmini.run_btax_mini(year_list, tidy=True)
+    assert list(tidy.columns) == ['Asset', 'year'] + BtaxMini.MEASURES
+    assert len(tidy) == 95 * 3
+    row = tidy[(tidy['Asset'] == wide['Asset'][4]) & (tidy['year'] == 2029)]
+    assert np.isclose(row['u_c'].values[0], wide['u_c2029'][4], rtol=1e-12)
+
+
+def test_calc_Dlist_by_method_codes(clp_params_df):
+    """
+    Test that calc_Dlist gives the same deductions for arrays of method
+    codes as for each method name separately.
+    """
+    btaxmini = BtaxMini(clp_params_df)
+    method = np.array(Asset.METHODS * 2, dtype=object)
+    life = np.array([5., 7., 39., 9e99, 9e99, 9e99] * 2)
+    delta = np.full(len(method), 0.1)
+    bonus = np.array([0.] * 6 + [0.5] * 6)
+    # The final period of economic depreciation underflows to zero
+    with np.errstate(under='ignore'):
+        Dlist = btaxmini.calc_Dlist(Asset.method_code(method), life, delta,
+                                    0.07, 0.02, bonus, 50)
+        assert Dlist.shape == (len(method), 50)
+        for j in range(len(method)):
+            expect = btaxmini.calc_Dlist(method[j], life[j], delta[j],
+                                         0.07, 0.02, bonus[j], 50)
+            assert np.allclose(Dlist[j], expect)
+    assert np.allclose(Dlist[5], 0.)
+    assert np.isclose(Dlist[4, 0], 1.)
+
+
+def test_calc_arrays(clp_params_df):
+    """
+    Test that the array engine matches the per-asset user cost and EATR.
+    """
+    btaxmini = BtaxMini(clp_params_df)
+    years = [2017, 2025]
+    (rho, uc, eatr) = btaxmini.calc_arrays(years)
+    assert rho.shape == (2, 95, 2)
+    assert np.allclose(uc - rho, uc[0] - rho[0])
+    Delta = np.array(Data().taxdep_info_gross('pre2017')['delta'])
+    asset = btaxmini.asset_c
+    with np.errstate(under='ignore'):
+        for k, year in enumerate(years):
+            (r_c, r_nc, r_d, pi, f_c, f_nc) = (
+                btaxmini.get_econ_params_oneyear(year))
+            (fracded_c, fracded_nc) = btaxmini.calc_frac_ded(year)
+            tdict_c = btaxmini.make_tdict_c(year)
+            tdict_nc = btaxmini.make_tdict_nc(year)
+            for j in range(0, 95, 4):
+                rules = (Delta[j], asset.method_codes[j, year - HISTORY_START],
+                         asset.life_history[j, year - HISTORY_START],
+                         asset.bonus_history[j, year - HISTORY_START])
+                assert np.isclose(uc[0, j, k],
+                                  btaxmini.calc_usercost(r_c, pi, *rules,
+                                                         f_c, r_d, fracded_c,
+                                                         tdict_c),
+                                  rtol=1e-12)
+                assert np.isclose(eatr[1, j, k],
+                                  btaxmini.calc_eatr(0.2, r_nc, pi, *rules,
+                                                     f_nc, r_d, fracded_nc,
+                                                     tdict_nc),
+                                  rtol=1e-12)
+
+
+def test_calc_rho_eatr(clp_params_df):
+    """
+    Test the combined cost of capital and EATR calculation.
+    """
+    btaxmini = BtaxMini(clp_params_df)
+    tdict = btaxmini.make_tdict_c(2018)
+    args = (0.07, 0.02, 0.1, 'DB 200%', 7., 0.5, 0.3, 0.05, 1., tdict)
+    with np.errstate(under='ignore'):
+        (rho, eatr) = btaxmini.calc_rho_eatr(0.2, *args)
+        assert rho == btaxmini.calc_rho(*args)
+        assert eatr == btaxmini.calc_eatr(0.2, *args)
+
+
+def test_analytic_present_values(clp_params_df):
+    """
+    Test present values over segments of constant tax rates against the
+    grid of periods, and against the closed form for straight-line
+    depreciation beyond the final period of the grid.
+    """
+    analytic = BtaxMini(clp_params_df)
+    grid = BtaxMini(clp_params_df, analytic=False)
+    tdict = {'0': 0.35, '1': 0.21, '2': 0.21, '9': 0.28}
+    (a, b, T) = analytic.calc_segments(tdict)
+    assert np.allclose(a, [0., 0.5, 8.5])
+    assert np.allclose(T, [0.35, 0.21, 0.28])
+    with np.errstate(under='ignore'):
+        for (method, life, bonus) in [('DB 200%', 7., 0.), ('SL', 39., 0.5),
+                                      ('Economic', 15., 0.3),
+                                      ('Expensing', 5., 0.)]:
+            args = (0.07, 0.02, 0.1, method, life, bonus, 0.3, 0.05, 1., tdict)
+            assert np.allclose(analytic.calc_pv_sums(*args),
+                               grid.calc_pv_sums(*args), rtol=1e-12)
+        (A, _, _) = analytic.calc_pv_sums(0.07, 0.02, 0.1, 'SL', 60., 0.,
+                                          0.3, 0.05, 1., {'0': 0.3})
+    assert np.isclose(A, 0.3 * (1 - np.exp(-0.09 * 60.)) / (0.09 * 60.),
+                      rtol=1e-12)
+    (rho_a, _, _) = analytic.calc_arrays([2018, 2027])
+    (rho_g, _, _) = grid.calc_arrays([2018, 2027])
+    life = analytic.asset_c.life_history[:, [2018 - HISTORY_START,
+                                             2027 - HISTORY_START]]
+    assert np.allclose(rho_a[:, life < 49.5], rho_g[:, life < 49.5],
+                       rtol=1e-12)
+
+
+@pytest.mark.parametrize('executor', ['thread', 'process'])
+def test_calc_results_executor(executor, clp_params_df):
+    """
+    Test that years calculated in parallel match the serial results.
+    """
+    btaxmini = BtaxMini(clp_params_df)
+    year_list = [2019, 2017, 2028]
+    serial = btaxmini.calc_results(year_list)
+    parallel = btaxmini.calc_results(year_list, executor=executor)
+    assert np.allclose(parallel, serial, rtol=1e-12)
+    with pytest.raises(ValueError):
+        btaxmini.calc_results(year_list, executor='gpu')
+
+
+def test_submit_results_chunks(clp_params_df):
+    """
+    Test that the years are submitted in contiguous chunks, one for each
+    worker, which together match the serial results.
+    """
+    btaxmini = BtaxMini(clp_params_df)
+    year_list = list(range(2017, 2027))
+    serial = btaxmini.calc_results(year_list)
+    for (nworkers, nchunks) in [(1, 1), (3, 3), (16, 10)]:
+        with concurrent.futures.ThreadPoolExecutor(nworkers) as executor:
+            futures = btaxmini.submit_results(executor, year_list,
+                                              max_workers=nworkers)
+            chunks = [future.result() for future in futures]
+        assert len(chunks) == nchunks
+        assert np.allclose(np.concatenate(chunks, axis=1), serial,
+                           rtol=1e-12)
+    with pytest.raises(ValueError):
+        btaxmini.submit_results(None, year_list, max_workers=0)
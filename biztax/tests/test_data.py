@@ -1,7 +1,9 @@
 """
 Test Data class.
 """
+import os
 import numpy as np
+import pandas as pd
 import pytest
 from biztax import Data, NUM_YEARS
 
@@ -25,3 +27,92 @@ def test_update_rescaling():
     data.update_rescaling(ones * sf_corp, ones * sf_noncorp)
     assert np.allclose(data.rescale_corp, ones * sf_corp)
     assert np.allclose(data.rescale_noncorp, ones * sf_noncorp)
+
+
+def test_shared_snapshot():
+    """
+    Test that Data objects share datasets but not rescaling factors, and
+    that changing a dataset does not change the shared snapshot.
+    """
+    data1 = Data()
+    data2 = Data()
+    assert data1.investment_corp.equals(data2.investment_corp)
+    assert data1.param_amt == data2.param_amt
+    investment_corp = data1.investment_corp
+    investment_corp.iloc[:, 1:] = 0.
+    investment_corp['extra'] = 1.
+    assert not data2.investment_corp.equals(investment_corp)
+    assert 'extra' not in Data().investment_corp
+    ones = np.ones(NUM_YEARS)
+    data1.update_rescaling(ones * 2.0, ones * 3.0)
+    assert np.allclose(data2.rescale_corp, ones)
+    assert np.allclose(data2.rescale_noncorp, ones)
+    # clearing the snapshot makes datasets get read again
+    snapshot = Data._snapshot['investment_corp']
+    Data.clear_snapshot()
+    data3 = Data()
+    assert data3.investment_corp.equals(snapshot)
+    assert Data._snapshot['investment_corp'] is not snapshot
+
+
+def test_lazy_loading():
+    """
+    Test that datasets are read on first use and that preload reads all.
+    """
+    Data.clear_snapshot()
+    data = Data()
+    assert 'debt_data' not in Data._snapshot
+    debt_data = data.debt_data
+    assert 'debt_data' in Data._snapshot
+    snapshot = Data._snapshot['debt_data']
+    assert Data().debt_data.equals(debt_data)
+    assert Data._snapshot['debt_data'] is snapshot
+    assert 'capital_corp' not in Data._snapshot
+    assert data.intshare_sp_neginc > 0.
+    assert 'depshare_sp_posinc' in Data._snapshot
+    with pytest.raises(AttributeError):
+        data.unknown_dataset
+    Data.preload()
+    for name in list(Data.DATASETS) + list(Data.FACTORS):
+        assert name in Data._snapshot
+
+
+def test_compiled_csv_cache(tmp_path, monkeypatch):
+    """
+    Test that the compiled CSV cache returns the parsed CSV contents and
+    is rebuilt when the CSV file changes.
+    """
+    cache_dir = tmp_path / 'cache'
+    monkeypatch.setattr(Data, 'CACHE_DIR', str(cache_dir))
+    csv_path = str(tmp_path / 'example.csv')
+    exp = pd.DataFrame({'year': [2014, 2015], 'code': ['EP1A', np.nan],
+                        'value': [0.5, 1.5]})
+    exp.to_csv(csv_path, index=False)
+    for _ in range(2):  # first call builds the entry, second reads it
+        act = Data.read_csv(csv_path)
+        assert act.equals(pd.read_csv(csv_path))
+        assert list(act.dtypes) == list(pd.read_csv(csv_path).dtypes)
+    assert len(os.listdir(str(cache_dir))) == 1
+    exp['value'] = [2.5, 3.5]
+    exp.to_csv(csv_path, index=False)
+    act = Data.read_csv(csv_path)
+    assert np.allclose(act['value'], [2.5, 3.5])
+    assert len(os.listdir(str(cache_dir))) == 1
+
+
+def test_memoized_depreciation_info():
+    """
+    Test that econ_depr_df and taxdep_info_gross are built once and return
+    copies that callers may change.
+    """
+    data = Data()
+    econ1 = Data.econ_depr_df()
+    econ1['delta'] = 0.
+    econ2 = Data.econ_depr_df()
+    assert (econ2['delta'] > 0.).all()
+    taxdep1 = data.taxdep_info_gross('pre2017')
+    taxdep1.drop(['L_gds'], axis=1, inplace=True)
+    taxdep2 = data.taxdep_info_gross('pre2017')
+    assert 'L_gds' in taxdep2
+    assert ('taxdep_info_gross', 'pre2017') in Data._snapshot
+    assert len(data.taxdep_info_gross('tcja')) == len(taxdep2)
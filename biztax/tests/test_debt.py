@@ -53,6 +53,9 @@ def test_instantiation(clp_params_df):
     Debt(good_btax_params, good_asset_forecast, corp=False)
     with pytest.raises(ValueError):
         Debt(good_btax_params, good_asset_forecast, eta=-0.2)
+    # eta must be less than 1
+    with pytest.raises(ValueError):
+        Debt(good_btax_params, good_asset_forecast, eta=1.)
     Debt(good_btax_params, good_asset_forecast, response=good_response)
     with pytest.raises(ValueError):
         Debt(good_btax_params, good_asset_forecast, response=bad_response)
@@ -70,3 +73,106 @@ def test_constrain_history(clp_params_df):
     debt.originations[0] = -9.9  # triggers constrain_history logic
     debt.constrain_history()
     assert min(debt.originations) == 0.0
+
+
+def test_constrain_history_batch(clp_params_df):
+    """
+    Test the closed-form constraint for a batch of scenarios against the
+    year-by-year recursion, and the record of binding years.
+    """
+    etas = np.array([0.4, 0.05, 0.9, 0.05])
+    responses = np.zeros((4, 16))
+    responses[1, 3:] = -0.5
+    responses[3, 3:] = 0.2
+    debt = Debt(clp_params_df, np.ones(16), eta=etas, response=responses)
+    debt.get_haircuts()
+    debt.build_level_history()
+    debt.build_flow_history()
+    L_opt = debt.debt_liab_history.copy()
+    O_opt = debt.originations.copy()
+    debt.constrain_history()
+    assert debt.binding_years.shape == (4, 70)
+    for s, eta in enumerate(etas):
+        if min(O_opt[s]) >= 0.:
+            assert np.array_equal(debt.debt_liab_history[s], L_opt[s])
+            assert not debt.binding_years[s].any()
+            continue
+        L = np.zeros(70)
+        L[0] = L_opt[s, 0]
+        binding = np.zeros(70, bool)
+        for i in range(1, 70):
+            binding[i] = L_opt[s, i] < L[i-1] * (1 - eta)
+            L[i] = max(L_opt[s, i], L[i-1] * (1 - eta))
+        assert np.allclose(debt.debt_liab_history[s], L, rtol=1e-12)
+        assert np.array_equal(debt.binding_years[s], binding)
+        assert min(debt.originations[s]) == 0.0
+    assert debt.binding_years[1].any()
+
+
+@pytest.mark.parametrize('eta', [0.4, 0.05, 0.9])
+def test_recursive_interest_expense(eta, clp_params_df):
+    """
+    Test that the recursive interest expense matches the direct sum.
+    """
+    asset = Asset(clp_params_df)
+    asset.calc_all()
+    debt = Debt(clp_params_df, asset.get_forecast(), eta=eta)
+    debt.calc_all()
+    recursive = debt.int_expense
+    debt.calc_real_interest(recursive=False)
+    assert np.allclose(recursive, debt.int_expense, rtol=1e-12)
+
+
+def test_tax_interest_scenarios(reforms):
+    """
+    Test deductible interest for a batch of haircut scenarios against
+    separate calculations for each scenario.
+    """
+    debts = list()
+    for reform_number in [0, 2]:
+        params = reforms[reform_number]['params_df']
+        debt = Debt(params, np.ones(16))
+        debt.calc_all()
+        debts.append(debt)
+    haircuts = {key: np.array([debt.haircuts[key] for debt in debts])
+                for key in debts[0].haircuts}
+    int_expded = debts[0].tax_interest(haircuts)
+    assert int_expded.shape == (2, len(debts[0].int_expded))
+    assert np.allclose(int_expded[0], debts[0].int_expded)
+    assert np.allclose(int_expded[1], debts[1].int_expded)
+    assert (int_expded[1, -5:] < int_expded[0, -5:]).all()
+
+
+def test_eta_grid(clp_params_df):
+    """
+    Test a batch of retirement rates and responses against separate
+    Debt calculations for each scenario.
+    """
+    asset = Asset(clp_params_df)
+    asset.calc_all()
+    forecast = asset.get_forecast()
+    etas = np.array([0.4, 0.05, 0.9])
+    responses = np.zeros((3, 16))
+    responses[1, 3:] = -0.5  # binding debt constraint at low eta
+    debt = Debt(clp_params_df, forecast, eta=etas, response=responses)
+    debt.calc_all()
+    assert debt.batch_shape == (3,)
+    assert len(debt.interest_path) == 3 * 16
+    for k, eta in enumerate(etas):
+        single = Debt(clp_params_df, forecast, eta=eta,
+                      response=responses[k])
+        single.calc_all()
+        assert np.allclose(debt.get_nid()[k], single.get_nid(), rtol=1e-12)
+        assert np.allclose(debt.get_nip()[k], single.get_nip(), rtol=1e-12)
+        assert np.allclose(debt.get_debt()[k], single.get_debt(), rtol=1e-12)
+        path = debt.interest_path[debt.interest_path['scenario'] == k]
+        assert (path['eta'] == eta).all()
+    with pytest.raises(ValueError):
+        Debt(clp_params_df, forecast, eta=np.array([0.4, 1.2]))
+    with pytest.raises(ValueError):
+        Debt(clp_params_df, forecast, eta=np.array([0.4, 1.]))
+    with pytest.raises(ValueError):
+        Debt(clp_params_df, forecast, response=np.zeros((3, 13)))
+    # eta values and response rows are paired, so their numbers must match
+    with pytest.raises(ValueError, match='same number of scenarios'):
+        Debt(clp_params_df, forecast, eta=etas[:2], response=responses)
@@ -1,9 +1,11 @@
 """
 Test Response class.
 """
+import os
+import concurrent.futures
 import numpy as np
 import pytest
-from biztax import Response
+from biztax import Response, BtaxMini, Corporation, Data
 
 
 def test_calc_all_already_called():
@@ -22,3 +24,154 @@ def test_update_elasticities():
     with pytest.raises(ValueError):
         response.update_elasticities({'unknown_elasticity_name': 0.0})
     response.update_elasticities({'inv_eatr_c': -0.8})
+
+
+def test_baseline_btaxmini_cache(clp_params_df, tmp_path, monkeypatch):
+    """
+    Test that baseline BtaxMini results are cached by parameter contents,
+    in memory and on disk.
+    """
+    monkeypatch.setattr(Response, 'CACHE_DIR', str(tmp_path))
+    Response.clear_btaxmini_cache()
+    years = range(2020, 2030)
+    results = Response.baseline_btaxmini_results(clp_params_df, years)
+    assert results.shape == (95, 10, 4)
+    assert not results.flags.writeable
+    expect = BtaxMini(clp_params_df).calc_results(years)
+    assert np.allclose(results, expect, rtol=1e-12)
+    # A copy of the parameters hits the cache in memory
+    assert Response.baseline_btaxmini_results(clp_params_df.copy(),
+                                              years) is results
+    assert len(os.listdir(str(tmp_path))) == 1
+    # Other parameters or years are different entries
+    params = clp_params_df.copy()
+    params['tau_c'] = 0.25
+    assert (Response.btaxmini_key(params, years)
+            != Response.btaxmini_key(clp_params_df, years))
+    assert (Response.btaxmini_key(clp_params_df, range(2021, 2030))
+            != Response.btaxmini_key(clp_params_df, years))
+    # Changes to the data or to the version of the calculations do
+    key = Response.btaxmini_key(clp_params_df, years)
+    version = Response.BTAXMINI_VERSION
+    monkeypatch.setattr(Response, 'BTAXMINI_VERSION', version + 1)
+    assert Response.btaxmini_key(clp_params_df, years) != key
+    monkeypatch.setattr(Response, 'BTAXMINI_VERSION', version)
+    taxdep = Data().taxdep_info_gross('pre2017')
+    taxdep.loc[0, 'delta'] += 0.01
+    monkeypatch.setitem(Data._snapshot, ('taxdep_info_gross', 'pre2017'),
+                        taxdep)
+    assert Response.btaxmini_key(clp_params_df, years) != key
+    monkeypatch.delitem(Data._snapshot, ('taxdep_info_gross', 'pre2017'))
+    assert Response.btaxmini_key(clp_params_df, years) == key
+    # Parameters BtaxMini does not use do not change the key
+    params = clp_params_df.copy()
+    params['tau_amt'] = 0.5
+    assert (Response.btaxmini_key(params, years)
+            == Response.btaxmini_key(clp_params_df, years))
+    # Results are read from disk in a new process
+    Response.clear_btaxmini_cache()
+    monkeypatch.setattr(BtaxMini, 'calc_results', None)
+    ondisk = Response.baseline_btaxmini_results(clp_params_df, years)
+    assert np.array_equal(ondisk, results)
+    Response.clear_btaxmini_cache()
+
+
+def test_baseline_btaxmini_cache_bounded(clp_params_df, monkeypatch):
+    """
+    Test that only the most recently used baseline BtaxMini results are
+    kept in memory.
+    """
+    monkeypatch.setattr(Response, 'CACHE_DIR', None)
+    monkeypatch.setattr(Response, 'MAX_CACHED', 2)
+    Response.clear_btaxmini_cache()
+    first = Response.baseline_btaxmini_results(clp_params_df, [2020])
+    Response.baseline_btaxmini_results(clp_params_df, [2021])
+    # Using the first results again keeps them over the second
+    assert Response.baseline_btaxmini_results(clp_params_df,
+                                              [2020]) is first
+    Response.baseline_btaxmini_results(clp_params_df, [2022])
+    assert (list(Response._btaxmini_cache)
+            == [Response.btaxmini_key(clp_params_df, [2020]),
+                Response.btaxmini_key(clp_params_df, [2022])])
+    Response.clear_btaxmini_cache()
+
+
+def response_params(reforms):
+    """
+    Returns copies of baseline and reform parameters, with the parameters
+    that the static Corporation calculations add to them.
+    """
+    params_base = reforms[0]['params_df'].copy()
+    params_ref = reforms[1]['params_df'].copy()
+    Corporation(params_base).calc_static()
+    Corporation(params_ref).calc_static()
+    return (params_base, params_ref)
+
+
+def test_investment_response_executor(reforms):
+    """
+    Test that the investment response is the same when the reform is
+    calculated in parallel, including with an executor from the caller.
+    """
+    (params_base, params_ref) = response_params(reforms)
+    response = Response()
+    response.update_elasticities({'inv_usercost_c': -1.0,
+                                  'inv_eatr_nc': -0.5,
+                                  'mne_share_nc': 0.5})
+    response.calc_all(params_base, params_ref)
+    expect = response.investment_response
+    response.executor = 'thread'
+    response.calc_all(params_base, params_ref)
+    assert list(response.investment_response.columns) == list(expect.columns)
+    assert np.allclose(response.investment_response['deltaIc2020'],
+                       expect['deltaIc2020'], rtol=1e-12)
+    response.max_workers = 2
+    with concurrent.futures.ThreadPoolExecutor(2) as executor:
+        response.executor = executor
+        response.calc_all(params_base, params_ref)
+    assert np.allclose(response.investment_response['MPKnc2029'],
+                       expect['MPKnc2029'], rtol=1e-12)
+
+
+def test_calc_responses_reuses_inputs(reforms):
+    """
+    Test that responses calculated from shared inputs for several sets of
+    elasticities match separate calc_all calls.
+    """
+    (params_base, params_ref) = response_params(reforms)
+    sweep = Response()
+    sweep.calc_inputs(params_base, params_ref, firstyear=2017)
+    inputs = sweep.inputs
+    elasticities_list = [
+        {'inv_usercost_c': -1.0, 'debt_taxshield_c': 0.4},
+        {'inv_eatr_c': -0.3, 'mne_share_c': 0.5, 'reprate_inc': -10.0,
+         'shifting': 0.5, 'first_year_response': 2019},
+        {'inv_usercost_nc': -0.5, 'debt_taxshield_nc': 0.2,
+         'first_year_response': 2020}
+    ]
+    for elasticities in elasticities_list:
+        sweep.elasticities = dict(Response.DEFAULT_ELASTICITIES)
+        sweep.update_elasticities(elasticities)
+        sweep.calc_responses()
+        assert sweep.inputs is inputs
+        response = Response()
+        response.update_elasticities(elasticities)
+        response.calc_all(params_base, params_ref)
+        assert list(sweep.investment_response.columns) == list(
+            response.investment_response.columns)
+        columns = [col for col in response.investment_response.columns
+                   if col.startswith(('deltaI', 'MPK'))]
+        assert np.allclose(sweep.investment_response[columns],
+                           response.investment_response[columns],
+                           rtol=1e-12, atol=0.0)
+        assert np.allclose(sweep.debt_response, response.debt_response,
+                           rtol=1e-12, atol=0.0)
+        assert np.allclose(sweep.repatriation_response,
+                           response.repatriation_response,
+                           rtol=1e-12, atol=0.0)
+        assert np.allclose(sweep.shifting_response,
+                           response.shifting_response, rtol=1e-12, atol=0.0)
+    # Responses cannot start before the inputs do
+    sweep.update_elasticities({'first_year_response': 2016})
+    with pytest.raises(AssertionError):
+        sweep.calc_responses()
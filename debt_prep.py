@@ -137,7 +137,8 @@ def calcIDAdjustment(corp, eta=0.4):
     """
     Calculates the adjustment factors for the corporate and noncorporate
     debt and interest.
-    eta: retirement rate of existing debt
+    eta: retirement rate of existing debt, or an array of them (the
+         adjustment factors then have a leading eta axis)
     """
     data = Data()
     policy = Policy()
@@ -148,16 +149,16 @@ def calcIDAdjustment(corp, eta=0.4):
     # Get asset forecast
     forecast = asset.get_forecast()
     # Create Debt object
-    debt = Debt(policy_params_df, forecast, corp=corp)
+    debt = Debt(policy_params_df, forecast, corp=corp, eta=eta)
     debt.calc_all()
     # Get unscaled interest incomes and expenses
-    intpaid_model = debt.int_expense[40:54]
+    intpaid_model = debt.int_expense[..., 40:54]
     intinc_model = debt.int_income[40:54]
     muniinc_model = debt.muni_income[40:54]
     if corp:
         # Exclude anomalous results for 2007
-        paid_scale = (sum(intpaid[:7] / intpaid_model[:7]) +
-                      sum(intpaid[8:] / intpaid_model[8:])) / 13.
+        paid_scale = (np.sum(intpaid[:7] / intpaid_model[..., :7], axis=-1) +
+                      np.sum(intpaid[8:] / intpaid_model[..., 8:], axis=-1)) / 13.
         inc_scale = (sum(taxint[:7] / intinc_model[:7]) +
                      sum(taxint[8:] / intinc_model[8:])) / 13.
         muni_scale = (sum(ntaxint[:7] / muniinc_model[:7]) +
@@ -167,7 +168,7 @@ def calcIDAdjustment(corp, eta=0.4):
         ID_irs = np.array(data.debt_data_noncorp['ID_Scorp'][40:54] +
                           data.debt_data_noncorp['ID_sp'][40:54] +
                           data.debt_data_noncorp['ID_partner'][40:54])
-        scales = sum(ID_irs / intpaid_model) / 14.
+        scales = np.sum(ID_irs / intpaid_model, axis=-1) / 14.
     assets14 = forecast[0]
     return (scales, assets14, intpaid_model, intinc_model, muniinc_model)
 
@@ -94,7 +94,8 @@ def calcIDAdjustment(corp, eta=0.4):
     """
     Calculates the adjustment factors for the corporate and noncorporate
     debt and interest.
-    eta: retirement rate of existing debt
+    eta: retirement rate of existing debt, or an array of them (the
+         adjustment factors then have a leading eta axis)
     """
     policy = Policy()
     policy_params_df = policy.parameters_dataframe()
@@ -104,10 +105,10 @@ def calcIDAdjustment(corp, eta=0.4):
     # Get asset forecast
     forecast = asset.get_forecast()
     # Create Debt object
-    debt = Debt(policy_params_df, forecast, corp=corp)
+    debt = Debt(policy_params_df, forecast, corp=corp, eta=eta)
     debt.calc_all()
     # Get unscaled net interest deduction
-    NID_gross = debt.NID[38:54]
+    NID_gross = debt.int_expded[..., 38:54] - debt.int_income[38:54]
     # Get net interest deduction from historical IRS data
     if corp:
         NID_irs = np.array(data1.debt_data_corp['NID_IRS'])[38:54]
@@ -115,7 +116,7 @@ def calcIDAdjustment(corp, eta=0.4):
         NID_irs = np.array(data1.debt_data_noncorp['ID_Scorp'][38:54] +
                            data1.debt_data_noncorp['ID_sp'][38:54] +
                            data1.debt_data_noncorp['ID_partner'][38:54])
-    NID_scale = sum(NID_irs / NID_gross) / 16.0  # 16 = 54 - 38
+    NID_scale = np.sum(NID_irs / NID_gross, axis=-1) / 16.0  # 16 = 54 - 38
     return NID_scale
 
 